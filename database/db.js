@@ -2,6 +2,28 @@ const sqlite3 = require('sqlite3').verbose();
 const fs = require('fs');
 const path = require('path');
 const crypto = require('crypto');
+const { AsyncLocalStorage } = require('async_hooks');
+
+// Token lookups (tokens JOIN users) sit on every force-queue and remote
+// request. Active tokens are cached briefly; deactivation goes through
+// deactivateToken/deactivateUser, which invalidate the affected entries.
+const TOKEN_CACHE_MAX = parseInt(process.env.TOKEN_CACHE_MAX, 10) || 1000;
+const TOKEN_CACHE_TTL_MS = parseInt(process.env.TOKEN_CACHE_TTL_MS, 10) || 30000;
+
+// Prepared statements are reused per SQL text. Queries with a variable
+// number of placeholders produce distinct texts, hence the LRU bound.
+const STATEMENT_CACHE_MAX = 100;
+
+// A/B switches for tools/bench_force_queue.py --compare: STATEMENT_CACHE=0
+// prepares and finalizes every statement per call, and
+// FORCE_QUEUE_GROUPED_WRITES=0 runs a single push as separate statements
+// instead of one transaction.
+const STATEMENT_CACHE_ENABLED = process.env.STATEMENT_CACHE !== '0';
+const FORCE_QUEUE_GROUPED_WRITES = process.env.FORCE_QUEUE_GROUPED_WRITES !== '0';
+
+// Marks the statements issued from inside an exclusive section (a
+// transaction's fn), which must not wait for the section they belong to.
+const exclusiveContext = new AsyncLocalStorage();
 
 class Database {
     constructor(dbPath = null) {
@@ -47,6 +69,19 @@ class Database {
         this.dbPath = dbPath;
         this.db = null;
         this.isConnected = false;
+        this.txChain = Promise.resolve();
+        // While an exclusive section runs, the kinds of statements it blocks
+        // (writes for a transaction) wait on exclusiveGate; the section
+        // waits for those already running to drain first.
+        this.exclusiveGate = null;
+        this.activeStatements = { read: 0, write: 0 };
+        this.onStatementsIdle = null;
+        this.statements = new Map();
+        this.tokenCache = new Map();
+        // Bumped by every invalidation; a lookup only caches its row if no
+        // invalidation happened while its query ran
+        this.tokenCacheGeneration = 0;
+        this.tokenCacheStats = { hits: 0, misses: 0, evictions: 0, invalidations: 0 };
     }
 
     // Initialize database connection and run schema
@@ -93,23 +128,93 @@ class Database {
         });
     }
 
+    // Prepared statement for sql, cached in LRU order (oldest first)
+    async prepare(sql) {
+        let statement = this.statements.get(sql);
+        if (statement) {
+            this.statements.delete(sql);
+            this.statements.set(sql, statement);
+            return statement;
+        }
+
+        statement = this.prepareUncached(sql);
+        statement.catch(() => this.statements.delete(sql));
+        this.statements.set(sql, statement);
+
+        if (this.statements.size > STATEMENT_CACHE_MAX) {
+            const [oldestSql, oldest] = this.statements.entries().next().value;
+            this.statements.delete(oldestSql);
+            // Finalize is queued behind any call already made on the statement
+            oldest.then(stmt => stmt.finalize()).catch(() => {});
+        }
+        return statement;
+    }
+
+    prepareUncached(sql) {
+        return new Promise((resolve, reject) => {
+            const stmt = this.db.prepare(sql, (err) => {
+                if (err) {
+                    reject(err);
+                } else {
+                    resolve(stmt);
+                }
+            });
+        });
+    }
+
+    // Runs execute(stmt) with a prepared statement for sql
+    async withStatement(sql, execute) {
+        if (STATEMENT_CACHE_ENABLED) {
+            return execute(await this.prepare(sql));
+        }
+        const stmt = await this.prepareUncached(sql);
+        try {
+            return await execute(stmt);
+        } finally {
+            stmt.finalize();
+        }
+    }
+
+    // Runs execute(stmt) for sql. Outside an exclusive section, a statement
+    // of a kind the open section blocks waits for it to end: a write can
+    // never land inside another caller's transaction and be rolled back
+    // with it. Reads are not held up by transactions; one that runs while a
+    // transaction is open may see its uncommitted rows.
+    async statement(sql, execute, kind = 'read') {
+        if (exclusiveContext.getStore() === this) {
+            return this.withStatement(sql, execute);
+        }
+        while (this.exclusiveGate && this.exclusiveGate.blocks.includes(kind)) {
+            await this.exclusiveGate.opened;
+        }
+        this.activeStatements[kind]++;
+        try {
+            return await this.withStatement(sql, execute);
+        } finally {
+            this.activeStatements[kind]--;
+            if (this.onStatementsIdle) {
+                this.onStatementsIdle();
+            }
+        }
+    }
+
     // Generic query method
     async query(sql, params = []) {
-        return new Promise((resolve, reject) => {
-            this.db.all(sql, params, (err, rows) => {
+        return this.statement(sql, stmt => new Promise((resolve, reject) => {
+            stmt.all(params, (err, rows) => {
                 if (err) {
                     reject(err);
                 } else {
                     resolve(rows);
                 }
             });
-        });
+        }));
     }
 
     // Generic run method for INSERT/UPDATE/DELETE
     async run(sql, params = []) {
-        return new Promise((resolve, reject) => {
-            this.db.run(sql, params, function(err) {
+        return this.statement(sql, stmt => new Promise((resolve, reject) => {
+            stmt.run(params, function(err) {
                 if (err) {
                     reject(err);
                 } else {
@@ -119,19 +224,60 @@ class Database {
                     });
                 }
             });
-        });
+        }), 'write');
     }
 
     // Get single row
     async get(sql, params = []) {
-        return new Promise((resolve, reject) => {
-            this.db.get(sql, params, (err, row) => {
+        return this.statement(sql, stmt => new Promise((resolve, reject) => {
+            stmt.get(params, (err, row) => {
                 if (err) {
                     reject(err);
                 } else {
                     resolve(row);
                 }
             });
+            // Release the read cursor instead of leaving it open until the next bind
+            stmt.reset();
+        }));
+    }
+
+    // Run fn as an exclusive section: sections are serialized through a
+    // promise chain, and no statement of the blocked kinds from another
+    // caller runs from the time fn starts until it settles. Statements of
+    // those kinds already running when the section is reached finish first.
+    async exclusive(fn, blocks = ['write']) {
+        const result = this.txChain.then(() => exclusiveContext.run(this, async () => {
+            let openGate;
+            this.exclusiveGate = { blocks, opened: new Promise(resolve => { openGate = resolve; }) };
+            try {
+                while (blocks.some(kind => this.activeStatements[kind] > 0)) {
+                    await new Promise(resolve => { this.onStatementsIdle = resolve; });
+                }
+                this.onStatementsIdle = null;
+                return await fn();
+            } finally {
+                this.exclusiveGate = null;
+                openGate();
+            }
+        }));
+        this.txChain = result.catch(() => {});
+        return result;
+    }
+
+    // Run fn inside BEGIN IMMEDIATE/COMMIT as an exclusive section; fn must
+    // only use this.query/run/get and must not start another transaction.
+    async transaction(fn) {
+        return this.exclusive(async () => {
+            await this.run('BEGIN IMMEDIATE');
+            try {
+                const value = await fn();
+                await this.run('COMMIT');
+                return value;
+            } catch (error) {
+                await this.run('ROLLBACK').catch(() => {});
+                throw error;
+            }
         });
     }
 
@@ -161,6 +307,14 @@ class Database {
         return await this.get(sql, [id]);
     }
 
+    async deactivateUser(userId) {
+        const sql = 'UPDATE users SET is_active = 0, updated_at = CURRENT_TIMESTAMP WHERE id = ? AND is_active = 1';
+        const result = await this.run(sql, [userId]);
+        await this.invalidateUserSessions(userId);
+        this.invalidateUserTokens(userId);
+        return result.changes > 0;
+    }
+
     async updateUserLastLogin(userId) {
         const sql = 'UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?';
         return await this.run(sql, [userId]);
@@ -210,6 +364,57 @@ class Database {
         return await this.query(sql);
     }
 
+    // Build WHERE clause for bulk license operations
+    // filter: { unused, type, createdBefore, codes }
+    buildLicenseFilter(filter = {}) {
+        const clauses = [];
+        const params = [];
+
+        if (filter.unused) {
+            clauses.push('is_used = 0');
+        }
+        if (filter.type) {
+            clauses.push('license_type = ?');
+            params.push(filter.type);
+        }
+        if (filter.createdBefore) {
+            clauses.push('created_at < datetime(?)');
+            params.push(filter.createdBefore);
+        }
+        if (Array.isArray(filter.codes)) {
+            if (filter.codes.length === 0) {
+                clauses.push('0');
+            } else {
+                clauses.push(`code IN (${filter.codes.map(() => '?').join(', ')})`);
+                params.push(...filter.codes);
+            }
+        }
+
+        return {
+            where: clauses.length > 0 ? clauses.join(' AND ') : '1',
+            params
+        };
+    }
+
+    async countLicenses(filter = {}) {
+        const { where, params } = this.buildLicenseFilter(filter);
+        const result = await this.get(`SELECT COUNT(*) as count FROM licenses WHERE ${where}`, params);
+        return result.count;
+    }
+
+    // Deletes at most `limit` matching licenses in a single statement so the
+    // write lock is only held for one small batch at a time.
+    async purgeLicenses(filter = {}, limit = 500) {
+        const { where, params } = this.buildLicenseFilter(filter);
+        const sql = `
+            DELETE FROM licenses
+            WHERE id IN (SELECT id FROM licenses WHERE ${where} LIMIT ?)
+        `;
+        const result = await this.run(sql, [...params, limit]);
+        const remaining = await this.countLicenses(filter);
+        return { deleted: result.changes, remaining };
+    }
+
     generateLicenseCode() {
         const alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789";
         let code = "";
@@ -229,13 +434,72 @@ class Database {
     }
 
     async getTokenByValue(token) {
+        const cached = this.tokenCache.get(token);
+        if (cached && cached.expiresAt > Date.now()) {
+            // Re-insert to keep Map order as least-recently-used first
+            this.tokenCache.delete(token);
+            this.tokenCache.set(token, cached);
+            this.tokenCacheStats.hits++;
+            return cached.row;
+        }
+        this.tokenCacheStats.misses++;
+        const generation = this.tokenCacheGeneration;
+
         const sql = `
             SELECT t.*, u.username, u.display_name 
             FROM tokens t 
             JOIN users u ON t.user_id = u.id 
             WHERE t.token = ? AND t.is_active = 1 AND u.is_active = 1
         `;
-        return await this.get(sql, [token]);
+        const row = await this.get(sql, [token]);
+        // Only active tokens are cached, so new tokens never need invalidation.
+        // A row read before a deactivation that finished meanwhile is stale.
+        if (row && generation === this.tokenCacheGeneration) {
+            this.tokenCache.delete(token);
+            this.tokenCache.set(token, { row, expiresAt: Date.now() + TOKEN_CACHE_TTL_MS });
+            if (this.tokenCache.size > TOKEN_CACHE_MAX) {
+                this.tokenCache.delete(this.tokenCache.keys().next().value);
+                this.tokenCacheStats.evictions++;
+            }
+        } else {
+            this.tokenCache.delete(token);
+        }
+        return row;
+    }
+
+    invalidateToken(token) {
+        this.tokenCacheGeneration++;
+        if (this.tokenCache.delete(token)) {
+            this.tokenCacheStats.invalidations++;
+        }
+    }
+
+    invalidateUserTokens(userId) {
+        this.tokenCacheGeneration++;
+        for (const [token, entry] of this.tokenCache) {
+            if (entry.row.user_id === userId) {
+                this.tokenCache.delete(token);
+                this.tokenCacheStats.invalidations++;
+            }
+        }
+    }
+
+    getTokenCacheStats() {
+        const { hits, misses } = this.tokenCacheStats;
+        return {
+            ...this.tokenCacheStats,
+            size: this.tokenCache.size,
+            maxSize: TOKEN_CACHE_MAX,
+            ttlMs: TOKEN_CACHE_TTL_MS,
+            hitRate: hits + misses > 0 ? hits / (hits + misses) : 0
+        };
+    }
+
+    async deactivateToken(token) {
+        const sql = 'UPDATE tokens SET is_active = 0 WHERE token = ? AND is_active = 1';
+        const result = await this.run(sql, [token]);
+        this.invalidateToken(token);
+        return result.changes > 0;
     }
     
     // Alias for getTokenByValue for consistency
@@ -255,7 +519,7 @@ class Database {
 
     async getAllTokens() {
         const sql = `
-            SELECT t.token, u.username as owner, 
+            SELECT t.token, t.user_id, u.username as owner, 
                    (SELECT COUNT(*) FROM force_queue fq WHERE fq.token_id = t.id AND fq.is_processed = 0) as queued
             FROM tokens t 
             JOIN users u ON t.user_id = u.id 
@@ -281,17 +545,21 @@ class Database {
             throw new Error('Invalid token');
         }
 
-        const sql = 'INSERT INTO force_queue (token_id, force_id, force_data) VALUES (?, ?, ?)';
-        await this.run(sql, [tokenData.id, forceId, JSON.stringify(forceData)]);
-        
-        // Update token last used
-        await this.updateTokenLastUsed(token);
-        
-        // Get queue count
-        const countSql = 'SELECT COUNT(*) as count FROM force_queue WHERE token_id = ? AND is_processed = 0';
-        const countResult = await this.get(countSql, [tokenData.id]);
-        
-        return countResult.count;
+        const push = async () => {
+            const sql = 'INSERT INTO force_queue (token_id, force_id, force_data) VALUES (?, ?, ?)';
+            await this.run(sql, [tokenData.id, forceId, JSON.stringify(forceData)]);
+
+            // Update token last used
+            await this.run('UPDATE tokens SET last_used = CURRENT_TIMESTAMP WHERE id = ?', [tokenData.id]);
+
+            // Get queue count
+            const countSql = 'SELECT COUNT(*) as count FROM force_queue WHERE token_id = ? AND is_processed = 0';
+            const countResult = await this.get(countSql, [tokenData.id]);
+
+            return countResult.count;
+        };
+        // Insert, last_used update and count share one transaction (one commit)
+        return FORCE_QUEUE_GROUPED_WRITES ? await this.transaction(push) : await push();
     }
 
     async getForceQueue(token) {
@@ -331,6 +599,90 @@ class Database {
         return result.changes > 0;
     }
 
+    // === BATCHED FORCE QUEUE METHODS ===
+    // Each call resolves the token once and runs in a single transaction.
+
+    async addForcesToQueue(token, forces) {
+        const tokenData = await this.getTokenByValue(token);
+        if (!tokenData) {
+            throw new Error('Invalid token');
+        }
+
+        const queued = await this.transaction(async () => {
+            const sql = 'INSERT INTO force_queue (token_id, force_id, force_data) VALUES (?, ?, ?)';
+            for (const { forceId, forceData } of forces) {
+                await this.run(sql, [tokenData.id, forceId, JSON.stringify(forceData)]);
+            }
+            await this.run('UPDATE tokens SET last_used = CURRENT_TIMESTAMP WHERE id = ?', [tokenData.id]);
+
+            const countSql = 'SELECT COUNT(*) as count FROM force_queue WHERE token_id = ? AND is_processed = 0';
+            const countResult = await this.get(countSql, [tokenData.id]);
+            return countResult.count;
+        });
+
+        return { tokenData, queued };
+    }
+
+    async acknowledgeForces(token, forceIds) {
+        const tokenData = await this.getTokenByValue(token);
+        if (!tokenData) {
+            throw new Error('Invalid token');
+        }
+
+        const acknowledged = await this.transaction(async () => {
+            const placeholders = forceIds.map(() => '?').join(', ');
+            const pending = await this.query(`
+                SELECT force_id FROM force_queue
+                WHERE token_id = ? AND is_processed = 0 AND force_id IN (${placeholders})
+            `, [tokenData.id, ...forceIds]);
+
+            await this.run(`
+                UPDATE force_queue 
+                SET is_processed = 1, processed_at = CURRENT_TIMESTAMP 
+                WHERE token_id = ? AND is_processed = 0 AND force_id IN (${placeholders})
+            `, [tokenData.id, ...forceIds]);
+
+            return pending.map(row => row.force_id);
+        });
+
+        return { tokenData, acknowledged };
+    }
+
+    // Fetch and acknowledge pending forces atomically (oldest first)
+    async drainForceQueue(token, limit = 100) {
+        const tokenData = await this.getTokenByValue(token);
+        if (!tokenData) {
+            throw new Error('Invalid token');
+        }
+
+        const rows = await this.transaction(async () => {
+            const pending = await this.query(`
+                SELECT id, force_id, force_data, created_at 
+                FROM force_queue 
+                WHERE token_id = ? AND is_processed = 0 
+                ORDER BY created_at ASC, id ASC
+                LIMIT ?
+            `, [tokenData.id, limit]);
+
+            if (pending.length > 0) {
+                const placeholders = pending.map(() => '?').join(', ');
+                await this.run(`
+                    UPDATE force_queue 
+                    SET is_processed = 1, processed_at = CURRENT_TIMESTAMP 
+                    WHERE id IN (${placeholders})
+                `, pending.map(row => row.id));
+            }
+            return pending;
+        });
+
+        const queue = rows.map(item => ({
+            id: item.force_id,
+            force: JSON.parse(item.force_data),
+            createdAt: new Date(item.created_at).getTime()
+        }));
+        return { tokenData, queue };
+    }
+
     // === SETTINGS METHODS ===
 
     async getUserSetting(userId, key) {
@@ -471,6 +823,51 @@ class Database {
         return await this.query(sql, params);
     }
 
+    // Keyset-paginated audit log. `beforeId` pages backwards (newest first),
+    // `afterId` returns entries newer than the cursor (oldest first) for following.
+    async getAuditLogPage(options = {}) {
+        const { userId = null, action = null, since = null, until = null, beforeId = null, afterId = null, limit = 100 } = options;
+        const clauses = [];
+        const params = [];
+
+        if (userId) {
+            clauses.push('al.user_id = ?');
+            params.push(userId);
+        }
+        if (action) {
+            clauses.push('al.action = ?');
+            params.push(action);
+        }
+        if (since) {
+            clauses.push('al.created_at >= datetime(?)');
+            params.push(since);
+        }
+        if (until) {
+            clauses.push('al.created_at < datetime(?)');
+            params.push(until);
+        }
+        if (afterId) {
+            clauses.push('al.id > ?');
+            params.push(afterId);
+        } else if (beforeId) {
+            clauses.push('al.id < ?');
+            params.push(beforeId);
+        }
+
+        let sql = `
+            SELECT al.*, u.username
+            FROM audit_log al
+            LEFT JOIN users u ON al.user_id = u.id
+        `;
+        if (clauses.length > 0) {
+            sql += ' WHERE ' + clauses.join(' AND ');
+        }
+        sql += afterId ? ' ORDER BY al.id ASC LIMIT ?' : ' ORDER BY al.id DESC LIMIT ?';
+        params.push(limit);
+
+        return await this.query(sql, params);
+    }
+
     // === REMOTE SESSIONS METHODS ===
 
     async createOrUpdateRemoteSession(userId, token) {
@@ -561,15 +958,111 @@ class Database {
         return await this.query(sql);
     }
 
+    // === MAINTENANCE METHODS ===
+    // Retention runs in small batches so no single statement holds the
+    // write lock for long; callers loop until `remaining` is 0.
+
+    async compactForceQueue(olderThanDays, limit = 500, dryRun = false) {
+        const where = "is_processed = 1 AND processed_at < datetime('now', ?)";
+        const cutoff = `-${olderThanDays} days`;
+
+        if (dryRun) {
+            const row = await this.get(`SELECT COUNT(*) as count FROM force_queue WHERE ${where}`, [cutoff]);
+            return { matched: row.count };
+        }
+
+        const result = await this.run(`
+            DELETE FROM force_queue WHERE id IN (
+                SELECT id FROM force_queue WHERE ${where} LIMIT ?
+            )
+        `, [cutoff, limit]);
+        const row = await this.get(`SELECT COUNT(*) as count FROM force_queue WHERE ${where}`, [cutoff]);
+        return { deleted: result.changes, remaining: row.count };
+    }
+
+    // Roll audit rows older than the cutoff into audit_log_daily, then delete them
+    async compactAuditLog(olderThanDays, limit = 500, dryRun = false) {
+        // Resolve the cutoff once so the count, the rollup and the delete all
+        // see the same boundary, even if the clock ticks between statements
+        const { cutoff } = await this.get("SELECT datetime('now', ?) as cutoff", [`-${olderThanDays} days`]);
+        const countSql = 'SELECT COUNT(*) as count FROM audit_log WHERE created_at < ?';
+
+        if (dryRun) {
+            const row = await this.get(countSql, [cutoff]);
+            return { matched: row.count };
+        }
+
+        const deleted = await this.transaction(async () => {
+            const batch = await this.get(`
+                SELECT MAX(id) as maxId, COUNT(*) as count FROM (
+                    SELECT id FROM audit_log WHERE created_at < ? ORDER BY id LIMIT ?
+                )
+            `, [cutoff, limit]);
+            if (!batch.count) {
+                return 0;
+            }
+
+            const batchWhere = 'id <= ? AND created_at < ?';
+            await this.run(`
+                INSERT INTO audit_log_daily (day, action, user_id, count)
+                SELECT date(created_at), action, COALESCE(user_id, 0), COUNT(*)
+                FROM audit_log WHERE ${batchWhere}
+                GROUP BY date(created_at), action, COALESCE(user_id, 0)
+                ON CONFLICT(day, action, user_id) DO UPDATE SET count = count + excluded.count
+            `, [batch.maxId, cutoff]);
+            const result = await this.run(`DELETE FROM audit_log WHERE ${batchWhere}`, [batch.maxId, cutoff]);
+            return result.changes;
+        });
+
+        const row = await this.get(countSql, [cutoff]);
+        return { deleted, remaining: row.count };
+    }
+
+    async getStorageStats() {
+        const pageSize = (await this.get('PRAGMA page_size')).page_size;
+        const pageCount = (await this.get('PRAGMA page_count')).page_count;
+        const freePages = (await this.get('PRAGMA freelist_count')).freelist_count;
+        const rows = await this.get(`
+            SELECT
+                (SELECT COUNT(*) FROM force_queue) as forceQueue,
+                (SELECT COUNT(*) FROM force_queue WHERE is_processed = 1) as forceQueueProcessed,
+                (SELECT COUNT(*) FROM audit_log) as auditLog,
+                (SELECT COUNT(*) FROM audit_log_daily) as auditLogDaily
+        `);
+        return {
+            pageSize,
+            fileBytes: pageSize * pageCount,
+            freeBytes: pageSize * freePages,
+            rows
+        };
+    }
+
+    // Rebuilds the file to return free pages to the OS; locks the database
+    // for the duration, so only run it after compaction and off-peak.
+    async vacuum() {
+        // VACUUM cannot run inside a transaction or next to another running
+        // statement, so queue it behind transactions and hold off reads too
+        return this.exclusive(() => this.run('VACUUM'), ['read', 'write']);
+    }
+
     // Close database connection
     close() {
         if (this.db) {
-            this.db.close((err) => {
-                if (err) {
-                    console.error('Error closing database:', err);
-                } else {
-                    console.log('✅ Database connection closed');
-                }
+            // Cached statements must be finalized before the connection can close
+            const statements = [...this.statements.values()];
+            this.statements.clear();
+            const finalized = statements.map(statement => statement
+                .then(stmt => new Promise(resolve => stmt.finalize(resolve)))
+                .catch(() => {}));
+
+            Promise.all(finalized).then(() => {
+                this.db.close((err) => {
+                    if (err) {
+                        console.error('Error closing database:', err);
+                    } else {
+                        console.log('✅ Database connection closed');
+                    }
+                });
             });
         }
     }
@@ -0,0 +1,95 @@
+const test = require('node:test');
+const assert = require('node:assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const Database = require('./db');
+
+// Database logs its connection state; keep the test output to results
+console.log = () => {};
+
+async function openDatabase(t) {
+    const dir = fs.mkdtempSync(path.join(os.tmpdir(), 'imperia-db-'));
+    const db = new Database(path.join(dir, 'test.db'));
+    await db.init();
+    t.after(() => {
+        db.close();
+        fs.rmSync(dir, { recursive: true, force: true });
+    });
+    return db;
+}
+
+function deferred() {
+    let resolve;
+    const promise = new Promise(r => { resolve = r; });
+    return { promise, resolve };
+}
+
+test('reads are not blocked by an open transaction', async (t) => {
+    const db = await openDatabase(t);
+    const release = deferred();
+    const entered = deferred();
+    const tx = db.transaction(async () => {
+        await db.run("INSERT INTO audit_log (action, details) VALUES ('inside', '{}')");
+        entered.resolve();
+        await release.promise;
+    });
+    await entered.promise;
+
+    let writeDone = false;
+    const write = db.run("INSERT INTO audit_log (action, details) VALUES ('outside', '{}')")
+        .then(() => { writeDone = true; });
+    const row = await db.get('SELECT COUNT(*) as count FROM users');
+    assert.strictEqual(row.count, 0);
+    assert.strictEqual(writeDone, false, 'writes wait for the transaction');
+
+    release.resolve();
+    await Promise.all([tx, write]);
+    const actions = await db.query('SELECT action FROM audit_log ORDER BY id');
+    assert.deepStrictEqual(actions.map(r => r.action), ['inside', 'outside']);
+});
+
+test('a rollback keeps writes from other callers', async (t) => {
+    const db = await openDatabase(t);
+    const entered = deferred();
+    const tx = db.transaction(async () => {
+        await db.run("INSERT INTO audit_log (action, details) VALUES ('inside', '{}')");
+        entered.resolve();
+        await new Promise(resolve => setTimeout(resolve, 20));
+        throw new Error('boom');
+    });
+    await entered.promise;
+    const write = db.run("INSERT INTO audit_log (action, details) VALUES ('outside', '{}')");
+
+    await assert.rejects(tx, /boom/);
+    await write;
+    const actions = await db.query('SELECT action FROM audit_log');
+    assert.deepStrictEqual(actions.map(r => r.action), ['outside']);
+});
+
+test('a lookup racing a deactivation does not cache the token', async (t) => {
+    const db = await openDatabase(t);
+    const userId = await db.createUser({ username: 'u', displayName: 'U', email: 'u@example.com', password: 'pw' });
+    const token = await db.createToken(userId);
+
+    // Hold the lookup's result back until the deactivation has returned
+    const read = deferred();
+    const release = deferred();
+    const get = db.get.bind(db);
+    db.get = async (sql, params) => {
+        const row = await get(sql, params);
+        if (sql.includes('FROM tokens t')) {
+            read.resolve();
+            await release.promise;
+        }
+        return row;
+    };
+    const lookup = db.getTokenByValue(token);
+    await read.promise;
+    assert.strictEqual(await db.deactivateToken(token), true);
+    release.resolve();
+    await lookup;
+    db.get = get;
+
+    assert.strictEqual(await db.getTokenByValue(token), undefined);
+});
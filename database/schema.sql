@@ -106,6 +106,15 @@ CREATE TABLE IF NOT EXISTS audit_log (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL
 );
 
+-- Daily rollup of compacted audit_log rows (user_id 0 = no user)
+CREATE TABLE IF NOT EXISTS audit_log_daily (
+    day DATE NOT NULL,
+    action VARCHAR(100) NOT NULL,
+    user_id INTEGER NOT NULL DEFAULT 0,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, action, user_id)
+);
+
 -- Indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
@@ -115,6 +124,7 @@ CREATE INDEX IF NOT EXISTS idx_tokens_token ON tokens(token);
 CREATE INDEX IF NOT EXISTS idx_tokens_user ON tokens(user_id, is_active);
 CREATE INDEX IF NOT EXISTS idx_force_queue_token ON force_queue(token_id, is_processed);
 CREATE INDEX IF NOT EXISTS idx_force_queue_processed ON force_queue(is_processed, created_at);
+CREATE INDEX IF NOT EXISTS idx_force_queue_retention ON force_queue(is_processed, processed_at);
 CREATE INDEX IF NOT EXISTS idx_user_settings_lookup ON user_settings(user_id, setting_key);
 CREATE INDEX IF NOT EXISTS idx_webapp_settings_lookup ON webapp_settings(user_id, app_type, setting_key);
 CREATE INDEX IF NOT EXISTS idx_sessions_session_id ON sessions(session_id);
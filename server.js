@@ -4,6 +4,7 @@ require('dotenv').config(); // Load environment variables
 const express = require('express');
 const path = require('path');
 const crypto = require('crypto');
+const zlib = require('zlib');
 const cookieParser = require('cookie-parser');
 const Database = require('./database/db');
 const logger = require('./utils/logger');
@@ -71,6 +72,97 @@ function generateUUID() {
     return crypto.randomUUID();
 }
 
+// Responses smaller than this are sent uncompressed (overhead outweighs gain)
+const COMPRESSION_MIN_BYTES = 1024;
+
+// Pick the best supported encoding from the Accept-Encoding header
+function negotiateEncoding(req) {
+    const accepted = String(req.headers['accept-encoding'] || '')
+        .split(',')
+        .map(part => {
+            const [name, ...params] = part.trim().toLowerCase().split(';');
+            const q = params.find(p => p.trim().startsWith('q='));
+            return { name, q: q ? parseFloat(q.trim().slice(2)) : 1 };
+        })
+        .filter(enc => enc.q > 0)
+        .map(enc => enc.name);
+
+    for (const encoding of ['br', 'gzip', 'deflate']) {
+        if (accepted.includes(encoding)) return encoding;
+    }
+    return null;
+}
+
+// Send a JSON payload, compressed if the client accepts it
+function sendCompressedJson(req, res, payload) {
+    const body = Buffer.from(JSON.stringify(payload));
+    const encoding = body.length >= COMPRESSION_MIN_BYTES ? negotiateEncoding(req) : null;
+
+    res.set('Content-Type', 'application/json; charset=utf-8');
+    res.vary('Accept-Encoding');
+    if (!encoding) {
+        return res.send(body);
+    }
+
+    const compress = {
+        br: (buf, cb) => zlib.brotliCompress(buf, {
+            params: { [zlib.constants.BROTLI_PARAM_QUALITY]: 5 }
+        }, cb),
+        gzip: (buf, cb) => zlib.gzip(buf, cb),
+        deflate: (buf, cb) => zlib.deflate(buf, cb)
+    }[encoding];
+
+    compress(body, (err, compressed) => {
+        if (err) {
+            logger.error('Response compression failed:', err);
+            return res.send(body);
+        }
+        res.set('Content-Encoding', encoding);
+        res.send(compressed);
+    });
+}
+
+// Send an admin list. With ?shape=compact the column names are sent once
+// and each row as an array: { shape: 'compact', columns: [...], <key>: [[...], ...] }
+function sendAdminList(req, res, key, rows) {
+    if (req.query.shape === 'compact') {
+        const columns = rows.length > 0 ? Object.keys(rows[0]) : [];
+        return sendCompressedJson(req, res, {
+            shape: 'compact',
+            columns,
+            [key]: rows.map(row => columns.map(column => row[column]))
+        });
+    }
+    sendCompressedJson(req, res, { [key]: rows });
+}
+
+// === EVENT STREAM ===
+// Recent events are kept in a ring buffer so clients can resume with
+// Last-Event-ID. Ids carry a per-process boot id; after a restart clients
+// receive a `reset` event and must resync from the list endpoints.
+
+const EVENT_BUFFER_SIZE = 1000;
+const EVENT_HEARTBEAT_MS = 25000;
+const EVENT_BOOT_ID = Date.now().toString(36);
+const eventBuffer = [];
+const eventClients = new Set();
+let eventSeq = 0;
+
+function writeEvent(res, event) {
+    res.write(`id: ${EVENT_BOOT_ID}-${event.seq}\nevent: ${event.type}\ndata: ${JSON.stringify(event.data)}\n\n`);
+}
+
+function publishEvent(type, data) {
+    const event = { seq: ++eventSeq, type, data: { ...data, timestamp: Date.now() } };
+    eventBuffer.push(event);
+    if (eventBuffer.length > EVENT_BUFFER_SIZE) {
+        eventBuffer.shift();
+    }
+    for (const client of eventClients) {
+        writeEvent(client, event);
+    }
+}
+
 // In-memory sessions (enhanced)
 const sessions = new Map();
 
@@ -238,6 +330,9 @@ app.post('/auth/register', requireDB, async (req, res) => {
         // Create token for user
         const token = await db.createToken(userId);
 
+        publishEvent('license_redeemed', { code, userId, username });
+        publishEvent('token_created', { token, userId, username });
+
         // Create session
         const sessionId = createSession(userId, clientInfo);
         res.cookie('MAGIC_SESSION', sessionId, { 
@@ -298,7 +393,8 @@ app.post('/auth/login', requireDB, async (req, res) => {
         // Ensure user has a token
         let tokens = await db.getTokensByUserId(user.id);
         if (tokens.length === 0) {
-            await db.createToken(user.id);
+            const token = await db.createToken(user.id);
+            publishEvent('token_created', { token, userId: user.id, username: user.username });
         }
 
         // Create session
@@ -430,6 +526,7 @@ app.post('/auth/verify-license', requireDB, async (req, res) => {
         }
         
         // License is valid
+        publishEvent('license_checked', { code });
         res.json({ 
             ok: true, 
             message: 'Lizenz-Code ist gültig' 
@@ -468,23 +565,89 @@ app.post('/api/license', requireDB, requireAdminKey, async (req, res) => {
 app.get('/api/licenses', requireDB, requireAdminKey, async (req, res) => {
     try {
         const licenses = await db.getAllLicenses();
-        res.json({ licenses });
+        sendAdminList(req, res, 'licenses', licenses);
     } catch (error) {
         console.error('Get licenses error:', error);
         res.status(500).json({ error: 'Failed to get licenses' });
     }
 });
 
+// Bulk revoke/purge: deletes matching licenses in one bounded batch per request.
+// Clients repeat the call until `remaining` is 0.
+const PURGE_MAX_BATCH = 500;
+
+app.post('/api/licenses/purge', requireDB, requireAdminKey, async (req, res) => {
+    try {
+        const { filter = {}, dryRun = false } = req.body;
+        const limit = Math.min(Math.max(parseInt(req.body.limit, 10) || PURGE_MAX_BATCH, 1), PURGE_MAX_BATCH);
+
+        const hasCriteria = filter.unused || filter.type || filter.createdBefore || Array.isArray(filter.codes);
+        if (!hasCriteria) {
+            return res.status(400).json({ error: 'At least one filter criterion required' });
+        }
+        if (Array.isArray(filter.codes) && filter.codes.length > PURGE_MAX_BATCH) {
+            return res.status(400).json({ error: `At most ${PURGE_MAX_BATCH} codes per request` });
+        }
+        if (filter.createdBefore && isNaN(Date.parse(filter.createdBefore))) {
+            return res.status(400).json({ error: 'Invalid createdBefore date' });
+        }
+
+        if (dryRun) {
+            const matched = await db.countLicenses(filter);
+            return res.json({ ok: true, dryRun: true, matched });
+        }
+
+        const { deleted, remaining } = await db.purgeLicenses(filter, limit);
+
+        if (deleted > 0) {
+            const clientInfo = getClientInfo(req);
+            await db.logAction(null, 'licenses_purged', { filter, deleted }, clientInfo.ip, clientInfo.userAgent);
+        }
+
+        res.json({ ok: true, deleted, remaining });
+
+    } catch (error) {
+        console.error('License purge error:', error);
+        res.status(500).json({ error: 'Failed to purge licenses' });
+    }
+});
+
 app.get('/api/users', requireDB, requireAdminKey, async (req, res) => {
     try {
         const users = await db.getAllUsers();
-        res.json({ users });
+        sendAdminList(req, res, 'users', users);
     } catch (error) {
         console.error('Get users error:', error);
         res.status(500).json({ error: 'Failed to get users' });
     }
 });
 
+app.post('/api/users/:id/deactivate', requireDB, requireAdminKey, async (req, res) => {
+    try {
+        const userId = parseInt(req.params.id, 10);
+        if (!userId) {
+            return res.status(400).json({ error: 'Invalid user id' });
+        }
+
+        const deactivated = await db.deactivateUser(userId);
+        if (!deactivated) {
+            return res.status(404).json({ error: 'User not found' });
+        }
+
+        for (const [sessionId, session] of sessions) {
+            if (session.userId === userId) {
+                sessions.delete(sessionId);
+            }
+        }
+
+        await db.logAction(userId, 'user_deactivated', null, getClientInfo(req).ip);
+        res.json({ ok: true });
+    } catch (error) {
+        console.error('Deactivate user error:', error);
+        res.status(500).json({ error: 'Failed to deactivate user' });
+    }
+});
+
 // === TOKEN MANAGEMENT ===
 
 app.get('/api/user/tokens', requireDB, async (req, res) => {
@@ -507,6 +670,7 @@ app.get('/api/user/tokens', requireDB, async (req, res) => {
         if (tokens.length === 0) {
             // Create token if none exists
             const newToken = await db.createToken(user.id);
+            publishEvent('token_created', { token: newToken, userId: user.id, username: user.username });
             tokens.push({ token: newToken, created_at: new Date().toISOString() });
         }
 
@@ -584,6 +748,7 @@ app.post('/api/data/:token', requireDB, async (req, res) => {
                 forceData
             }, getClientInfo(req).ip);
         }
+        publishEvent('force_queued', { token, forceId, userId: tokenData ? tokenData.user_id : null, queued: queueCount });
 
         res.json({ ok: true, id: forceId, queued: queueCount });
 
@@ -627,6 +792,7 @@ app.post('/api/ack/:token', requireDB, async (req, res) => {
                     forceId
                 }, getClientInfo(req).ip);
             }
+            publishEvent('force_acked', { token, forceId, userId: tokenData ? tokenData.user_id : null });
             res.json({ ok: true });
         } else {
             res.status(404).json({ error: 'Force not found' });
@@ -638,18 +804,252 @@ app.post('/api/ack/:token', requireDB, async (req, res) => {
     }
 });
 
+// Batched variants: one token lookup, one transaction and one audit row
+// per request instead of per force.
+const FORCE_BATCH_MAX = 100;
+
+app.post('/api/data/:token/batch', requireDB, async (req, res) => {
+    try {
+        const { token } = req.params;
+        const { forces } = req.body;
+
+        if (!Array.isArray(forces) || forces.length === 0) {
+            return res.status(400).json({ error: 'forces array required' });
+        }
+        if (forces.length > FORCE_BATCH_MAX) {
+            return res.status(400).json({ error: `At most ${FORCE_BATCH_MAX} forces per batch` });
+        }
+        if (forces.some(force => !force || !force.mode)) {
+            return res.status(400).json({ error: 'Invalid force data - mode required' });
+        }
+
+        const entries = forces.map(forceData => ({ forceId: generateUUID(), forceData }));
+        const forceIds = entries.map(entry => entry.forceId);
+        const { tokenData, queued } = await db.addForcesToQueue(token, entries);
+
+        await db.logAction(tokenData.user_id, 'forces_created', {
+            token,
+            forceIds
+        }, getClientInfo(req).ip);
+        publishEvent('force_queued', { token, forceIds, count: forceIds.length, userId: tokenData.user_id, queued });
+
+        res.json({ ok: true, ids: forceIds, queued });
+
+    } catch (error) {
+        console.error('Add forces error:', error);
+        if (error.message === 'Invalid token') {
+            return res.status(404).json({ error: 'Token not found' });
+        }
+        res.status(500).json({ error: 'Failed to add forces' });
+    }
+});
+
+app.post('/api/ack/:token/batch', requireDB, async (req, res) => {
+    try {
+        const { token } = req.params;
+        const { forceIds } = req.body;
+
+        if (!Array.isArray(forceIds) || forceIds.length === 0) {
+            return res.status(400).json({ error: 'forceIds array required' });
+        }
+        if (forceIds.length > FORCE_BATCH_MAX) {
+            return res.status(400).json({ error: `At most ${FORCE_BATCH_MAX} force ids per batch` });
+        }
+
+        const { tokenData, acknowledged } = await db.acknowledgeForces(token, forceIds);
+
+        if (acknowledged.length > 0) {
+            await db.logAction(tokenData.user_id, 'forces_acknowledged', {
+                token,
+                forceIds: acknowledged
+            }, getClientInfo(req).ip);
+            publishEvent('force_acked', { token, forceIds: acknowledged, count: acknowledged.length, userId: tokenData.user_id });
+        }
+
+        const missing = forceIds.filter(id => !acknowledged.includes(id));
+        res.json({ ok: true, acknowledged, missing });
+
+    } catch (error) {
+        console.error('Acknowledge forces error:', error);
+        if (error.message === 'Invalid token') {
+            return res.status(404).json({ error: 'Token not found' });
+        }
+        res.status(500).json({ error: 'Failed to acknowledge forces' });
+    }
+});
+
+// Fetch and acknowledge pending forces in one step
+app.post('/api/drain/:token', requireDB, async (req, res) => {
+    try {
+        const { token } = req.params;
+        const limit = Math.min(Math.max(parseInt(req.body.limit, 10) || FORCE_BATCH_MAX, 1), FORCE_BATCH_MAX);
+
+        const { tokenData, queue } = await db.drainForceQueue(token, limit);
+
+        if (queue.length > 0) {
+            const forceIds = queue.map(item => item.id);
+            await db.logAction(tokenData.user_id, 'force_queue_drained', {
+                token,
+                forceIds
+            }, getClientInfo(req).ip);
+            publishEvent('force_acked', { token, forceIds, count: forceIds.length, userId: tokenData.user_id });
+        }
+
+        res.json({ ok: true, queue });
+
+    } catch (error) {
+        console.error('Drain queue error:', error);
+        if (error.message === 'Invalid token') {
+            return res.status(404).json({ error: 'Token not found' });
+        }
+        res.status(500).json({ error: 'Failed to drain queue' });
+    }
+});
+
 // === ADMIN ENDPOINTS ===
 
 app.get('/api/tokens', requireDB, requireAdminKey, async (req, res) => {
     try {
         const tokens = await db.getAllTokens();
-        res.json({ tokens });
+        sendAdminList(req, res, 'tokens', tokens);
     } catch (error) {
         console.error('Get all tokens error:', error);
         res.status(500).json({ error: 'Failed to get tokens' });
     }
 });
 
+app.get('/api/tokens/cache', requireDB, requireAdminKey, (req, res) => {
+    res.json(db.getTokenCacheStats());
+});
+
+app.post('/api/tokens/:token/deactivate', requireDB, requireAdminKey, async (req, res) => {
+    try {
+        const { token } = req.params;
+        const tokenData = await db.getTokenByValue(token);
+        const deactivated = await db.deactivateToken(token);
+        if (!deactivated) {
+            return res.status(404).json({ error: 'Token not found' });
+        }
+
+        await db.logAction(tokenData ? tokenData.user_id : null, 'token_deactivated', { token }, getClientInfo(req).ip);
+        res.json({ ok: true });
+    } catch (error) {
+        console.error('Deactivate token error:', error);
+        res.status(500).json({ error: 'Failed to deactivate token' });
+    }
+});
+
+// Audit log with keyset pagination: pass `before` (older pages) or `after`
+// (entries newer than a cursor) using the ids returned in a previous page.
+const AUDIT_LOG_MAX_PAGE = 200;
+
+app.get('/api/audit-log', requireDB, requireAdminKey, async (req, res) => {
+    try {
+        const { userId, action, since, until, before, after } = req.query;
+        const limit = Math.min(Math.max(parseInt(req.query.limit, 10) || 50, 1), AUDIT_LOG_MAX_PAGE);
+
+        for (const value of [since, until]) {
+            if (value && isNaN(Date.parse(value))) {
+                return res.status(400).json({ error: 'Invalid date filter' });
+            }
+        }
+
+        const rows = await db.getAuditLogPage({
+            userId: userId ? parseInt(userId, 10) : null,
+            action: action || null,
+            since: since || null,
+            until: until || null,
+            beforeId: before ? parseInt(before, 10) : null,
+            afterId: after ? parseInt(after, 10) : null,
+            limit
+        });
+
+        const entries = rows.map(row => {
+            let details = row.details;
+            try {
+                details = JSON.parse(row.details);
+            } catch {
+                // keep raw value
+            }
+            return { ...row, details };
+        });
+
+        // Cursor for the next page in the requested direction; null when exhausted
+        const last = entries[entries.length - 1];
+        const nextCursor = entries.length === limit && last ? last.id : null;
+
+        sendCompressedJson(req, res, { entries, nextCursor });
+    } catch (error) {
+        console.error('Get audit log error:', error);
+        res.status(500).json({ error: 'Failed to get audit log' });
+    }
+});
+
+// === MAINTENANCE (ADMIN) ===
+// Retention for force_queue (processed items) and audit_log (rolled into
+// audit_log_daily). One bounded batch per request; clients repeat the call
+// until `remaining` is 0, pausing in between so other writers get the lock.
+
+const COMPACT_MAX_BATCH = 500;
+const COMPACT_TARGETS = {
+    force_queue: (days, limit, dryRun) => db.compactForceQueue(days, limit, dryRun),
+    audit_log: (days, limit, dryRun) => db.compactAuditLog(days, limit, dryRun)
+};
+
+app.get('/api/maintenance/storage', requireDB, requireAdminKey, async (req, res) => {
+    try {
+        res.json(await db.getStorageStats());
+    } catch (error) {
+        console.error('Storage stats error:', error);
+        res.status(500).json({ error: 'Failed to get storage stats' });
+    }
+});
+
+app.post('/api/maintenance/compact', requireDB, requireAdminKey, async (req, res) => {
+    try {
+        const { target, dryRun = false } = req.body;
+        const olderThanDays = parseInt(req.body.olderThanDays, 10);
+        const limit = Math.min(Math.max(parseInt(req.body.limit, 10) || COMPACT_MAX_BATCH, 1), COMPACT_MAX_BATCH);
+
+        if (!COMPACT_TARGETS[target]) {
+            return res.status(400).json({ error: `target must be one of: ${Object.keys(COMPACT_TARGETS).join(', ')}` });
+        }
+        if (!(olderThanDays >= 1)) {
+            return res.status(400).json({ error: 'olderThanDays must be at least 1' });
+        }
+
+        const result = await COMPACT_TARGETS[target](olderThanDays, limit, dryRun);
+        if (dryRun) {
+            return res.json({ ok: true, dryRun: true, target, ...result });
+        }
+
+        if (result.deleted > 0) {
+            const clientInfo = getClientInfo(req);
+            await db.logAction(null, 'maintenance_compacted', { target, olderThanDays, deleted: result.deleted }, clientInfo.ip, clientInfo.userAgent);
+        }
+        res.json({ ok: true, target, ...result });
+
+    } catch (error) {
+        console.error('Compaction error:', error);
+        res.status(500).json({ error: 'Failed to compact table' });
+    }
+});
+
+app.post('/api/maintenance/vacuum', requireDB, requireAdminKey, async (req, res) => {
+    try {
+        const before = await db.getStorageStats();
+        await db.vacuum();
+        const after = await db.getStorageStats();
+
+        const clientInfo = getClientInfo(req);
+        await db.logAction(null, 'maintenance_vacuum', { before: before.fileBytes, after: after.fileBytes }, clientInfo.ip, clientInfo.userAgent);
+        res.json({ ok: true, before, after });
+    } catch (error) {
+        console.error('Vacuum error:', error);
+        res.status(500).json({ error: 'Failed to vacuum database' });
+    }
+});
+
 // === USER SETTINGS API ===
 
 app.get('/api/user/settings', requireDB, async (req, res) => {
@@ -925,6 +1325,7 @@ app.post('/api/data/:token', requireDB, async (req, res) => {
 
         // Log action
         await db.logAction(null, 'force_created', { token, forceId, forceType: finalForceType }, getClientInfo(req).ip);
+        publishEvent('force_queued', { token, forceId, userId: tokenData.user_id });
 
         res.json({ ok: true, forceId });
 
@@ -1143,6 +1544,42 @@ app.post('/api/remote/module/:token', requireDB, async (req, res) => {
     }
 });
 
+// === ADMIN EVENT STREAM (SSE) ===
+
+app.get('/api/events', requireAdminKey, (req, res) => {
+    res.set({
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'Connection': 'keep-alive',
+        'X-Accel-Buffering': 'no'
+    });
+    res.flushHeaders();
+    res.write('retry: 3000\n\n');
+
+    // Resume after the last seen event if it is still buffered
+    const lastEventId = req.get('Last-Event-ID') || req.query.lastEventId;
+    if (lastEventId) {
+        const [bootId, seqText] = String(lastEventId).split('-');
+        const seq = parseInt(seqText, 10) || 0;
+        const oldestSeq = eventBuffer.length > 0 ? eventBuffer[0].seq : eventSeq + 1;
+        if (bootId !== EVENT_BOOT_ID || seq < oldestSeq - 1) {
+            writeEvent(res, { seq: eventSeq, type: 'reset', data: { reason: bootId !== EVENT_BOOT_ID ? 'restart' : 'gap' } });
+        } else {
+            for (const event of eventBuffer) {
+                if (event.seq > seq) writeEvent(res, event);
+            }
+        }
+    }
+
+    eventClients.add(res);
+    const heartbeat = setInterval(() => res.write(': ping\n\n'), EVENT_HEARTBEAT_MS);
+
+    req.on('close', () => {
+        clearInterval(heartbeat);
+        eventClients.delete(res);
+    });
+});
+
 // === HEALTH & STATUS ===
 
 app.get('/health', (req, res) => {
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Micro-Benchmark für die Force-Queue von Imperia Magic.
+
+Misst den Durchsatz (Forces/s) gegen einen laufenden Server:
+- einzeln: POST /api/data/:token und POST /api/ack/:token pro Force
+- batch:   POST /api/data/:token/batch und POST /api/ack/:token/batch
+- drain:   POST /api/data/:token/batch und POST /api/drain/:token
+
+Beispiel:
+    python3 tools/bench_force_queue.py --token ABC123 --count 1000 --concurrency 8
+
+A/B-Vergleich: --compare misst dieselben Szenarien zusätzlich gegen einen
+zweiten Server (B) und gibt das Verhältnis B/A aus. B startet man auf der
+gleichen Datenbank mit einem der Schalter aus database/db.js, z.B.
+
+    PORT=3001 STATEMENT_CACHE=0 node server.js              # ohne Statement-Cache
+    PORT=3001 FORCE_QUEUE_GROUPED_WRITES=0 node server.js   # Einzel-Push ohne Transaktion
+    python3 tools/bench_force_queue.py --token ABC123 --compare http://localhost:3001
+
+Achtung: erzeugt echte Queue-Einträge und Audit-Log-Zeilen, daher nur gegen
+einen lokalen oder Test-Server laufen lassen.
+"""
+
+import argparse
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+DEFAULT_BASE_URL = os.environ.get("IMPERIA_BASE_URL", "http://localhost:3000")
+BATCH_SIZE = 100  # Server-Limit pro Batch
+
+_local = threading.local()
+
+
+def _session():
+    # Eine Session pro Thread, damit Verbindungen wiederverwendet werden
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def _post(base_url: str, path: str, data: dict):
+    start = time.perf_counter()
+    response = _session().post(f"{base_url}{path}", json=data, timeout=30)
+    elapsed = time.perf_counter() - start
+    if response.status_code != 200:
+        raise RuntimeError(f"{path}: Fehler {response.status_code}: {response.text}")
+    return response.json(), elapsed
+
+
+def _force(i: int):
+    return {"mode": "ms", "target": i, "app": "bench"}
+
+
+def _chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def bench_single(base_url, token, count, pool):
+    def push(i):
+        result, elapsed = _post(base_url, f"/api/data/{token}", _force(i))
+        return result["id"], elapsed
+
+    def ack(force_id):
+        return _post(base_url, f"/api/ack/{token}", {"forceId": force_id})[1]
+
+    pushed = list(pool.map(push, range(count)))
+    latencies = [elapsed for _, elapsed in pushed]
+    latencies += list(pool.map(ack, [force_id for force_id, _ in pushed]))
+    return latencies
+
+
+def bench_batch(base_url, token, count, pool):
+    def push(chunk):
+        result, elapsed = _post(base_url, f"/api/data/{token}/batch", {"forces": [_force(i) for i in chunk]})
+        return result["ids"], elapsed
+
+    def ack(ids):
+        return _post(base_url, f"/api/ack/{token}/batch", {"forceIds": ids})[1]
+
+    pushed = list(pool.map(push, _chunks(list(range(count)), BATCH_SIZE)))
+    latencies = [elapsed for _, elapsed in pushed]
+    latencies += list(pool.map(ack, [ids for ids, _ in pushed]))
+    return latencies
+
+
+def bench_drain(base_url, token, count, pool):
+    def push(chunk):
+        return _post(base_url, f"/api/data/{token}/batch", {"forces": [_force(i) for i in chunk]})[1]
+
+    latencies = list(pool.map(push, _chunks(list(range(count)), BATCH_SIZE)))
+    drained = 0
+    while drained < count:
+        result, elapsed = _post(base_url, f"/api/drain/{token}", {"limit": BATCH_SIZE})
+        latencies.append(elapsed)
+        if not result["queue"]:
+            break
+        drained += len(result["queue"])
+    return latencies
+
+
+SCENARIOS = {
+    "einzeln": bench_single,
+    "batch": bench_batch,
+    "drain": bench_drain,
+}
+
+
+def run(base_url, token, count, concurrency, scenarios, label="", header=True):
+    """Misst die Szenarien gegen einen Server; liefert Forces/s pro Szenario."""
+    # Vorhandene Einträge abholen, damit jede Messung mit leerer Queue startet
+    while _post(base_url, f"/api/drain/{token}", {"limit": BATCH_SIZE})[0]["queue"]:
+        pass
+
+    if header:
+        print(f"{'Server':<7}{'Szenario':<10} {'Forces':>7} {'Dauer':>8} {'Forces/s':>10} {'Requests':>9} "
+              f"{'p50 ms':>8} {'p95 ms':>8}")
+    throughput = {}
+    for name in scenarios:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            start = time.perf_counter()
+            latencies = SCENARIOS[name](base_url, token, count, pool)
+            elapsed = time.perf_counter() - start
+        latencies.sort()
+        p50 = statistics.median(latencies) * 1000
+        p95 = latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] * 1000
+        throughput[name] = count / elapsed
+        print(f"{label:<7}{name:<10} {count:>7} {elapsed:>7.2f}s {count / elapsed:>10.1f} {len(latencies):>9} "
+              f"{p50:>8.1f} {p95:>8.1f}")
+    return throughput
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Force-Queue Durchsatz messen (push + ack)")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument("--token", required=True, help="Aktiver Token eines Test-Users")
+    parser.add_argument("--count", type=int, default=500, help="Forces pro Szenario")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--scenario", choices=list(SCENARIOS), action="append",
+                        help="Nur bestimmte Szenarien (mehrfach möglich)")
+    parser.add_argument("--compare", metavar="URL",
+                        help="Zweiter Server (B) für einen A/B-Vergleich, z.B. mit STATEMENT_CACHE=0 "
+                             "oder FORCE_QUEUE_GROUPED_WRITES=0 gestartet")
+    parser.add_argument("--compare-token", help="Token auf Server B (Standard: --token)")
+    args = parser.parse_args()
+
+    scenarios = args.scenario or list(SCENARIOS)
+    if not args.compare:
+        run(args.base_url.rstrip("/"), args.token, args.count, args.concurrency, scenarios)
+        return
+
+    a = run(args.base_url.rstrip("/"), args.token, args.count, args.concurrency, scenarios, label="A")
+    b = run(args.compare.rstrip("/"), args.compare_token or args.token, args.count, args.concurrency,
+            scenarios, label="B", header=False)
+    print()
+    for name in scenarios:
+        print(f"{name:<10} B/A {b[name] / a[name]:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
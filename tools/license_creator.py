@@ -4,7 +4,7 @@ License Code Creator für Imperia Magic Webapp v3.0
 Für Pythonista iOS App - Enhanced Admin Management Tool
 
 Aktualisiert, um mit dem aktuellen Backend kompatibel zu sein:
-- Endpunkte abgeglichen (keine /api/audit-log oder /api/stats Endpunkte)
+- Endpunkte abgeglichen (kein /api/stats Endpunkt)
 - ADMIN_KEY und Basis-URL über Umgebungsvariablen konfigurierbar
 - Token- und Lizenz-Schema angepasst
 """
@@ -12,619 +12,54 @@ Aktualisiert, um mit dem aktuellen Backend kompatibel zu sein:
 import requests
 import json
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, wait, FIRST_COMPLETED
+from collections import Counter, defaultdict, deque
+import cProfile
 import csv
+import functools
+import io
 import os
+import pstats
+import random
+import sys
+import threading
 import time
+import tracemalloc
 
 # --- Konfiguration ---
 # Kann per Umgebungsvariablen überschrieben werden:
 #   - IMPERIA_BASE_URL: Basis-URL des Servers
 #   - ADMIN_KEY: Admin-Schlüssel für Admin-Endpunkte
+#   - IMPERIA_INSTANCES: Pfad zu einer JSON-Datei mit mehreren Instanzen
+#     (Multi-Instanz-Modus), z.B.
+#     [{"name": "staging", "base_url": "https://...", "admin_key": "...", "timeout": 10}]
+#   - IMPERIA_PROFILE: Profiling aller Befehle ("cprofile" oder "sample")
+#   - IMPERIA_PROFILE_DIR: Zielverzeichnis der Profiling-Reports (Standard: .)
+#   - IMPERIA_RETENTION_QUEUE_DAYS: Bestätigte Forces nach N Tagen löschen (Standard: 7)
+#   - IMPERIA_RETENTION_AUDIT_DAYS: Audit-Log nach N Tagen zu Tageswerten verdichten (Standard: 90)
 BASE_URL = os.environ.get("IMPERIA_BASE_URL", "https://imperia-magic.onrender.com")
 ADMIN_KEY = os.environ.get("ADMIN_KEY", "DevAdmin2025")
+INSTANCES_FILE = os.environ.get("IMPERIA_INSTANCES")
+DEFAULT_TIMEOUT = 10
+PROFILE_MODE = os.environ.get("IMPERIA_PROFILE", "").strip().lower()
+PROFILE_DIR = os.environ.get("IMPERIA_PROFILE_DIR", ".")
 
 
-# Farben für Terminal (optional)
-class Colors:
-    GREEN = '\033[92m'
-    RED = '\033[91m'
-    YELLOW = '\033[93m'
-    BLUE = '\033[94m'
-    MAGENTA = '\033[95m'
-    CYAN = '\033[96m'
-    RESET = '\033[0m'
-    BOLD = '\033[1m'
-
-
-def colored(text, color):
-    """Farbige Ausgabe (funktioniert in vielen Terminals)"""
-    try:
-        return f"{color}{text}{Colors.RESET}"
-    except Exception:
-        return text
-
-
-def create_license_codes(count: int = 1):
-    """Erstellt neue License Codes.
-
-    Args:
-        count: Anzahl der zu erstellenden Codes (1-100)
-
-    Returns:
-        Liste der erstellten License Codes
-    """
-    url = f"{BASE_URL}/api/license"
-    headers = {
-        "Content-Type": "application/json",
-        "x-admin-key": ADMIN_KEY,
-    }
-    data = {"count": count}
-
-    try:
-        print(colored(f"🎫 Erstelle {count} License Code(s)...", Colors.YELLOW))
-        response = requests.post(url, headers=headers, json=data, timeout=10)
-
-        if response.status_code == 200:
-            result = response.json()
-            codes = result.get("created", [])
-
-            print(colored(f"✅ Erfolgreich {len(codes)} Code(s) erstellt:", Colors.GREEN))
-            for i, code in enumerate(codes, 1):
-                print(f"  {i}. {colored(code, Colors.BOLD)}")
-
-            # Zeige Registrierungs-URL
-            print(f"\n🔗 Registrierung: {colored(BASE_URL + '/imperia/control/register.html', Colors.CYAN)}")
-
-            # Export Option
-            if len(codes) > 5:
-                export_choice = input("\n💾 Codes exportieren? (j/n): ").lower()
-                if export_choice == 'j':
-                    export_licenses(codes)
-
-            return codes
-
-        elif response.status_code == 401:
-            print(colored("❌ Fehler: Admin Key ungültig", Colors.RED))
-            print(f"Verwendeter Key: {ADMIN_KEY}")
-        else:
-            print(colored(f"❌ Fehler {response.status_code}: {response.text}", Colors.RED))
-
-    except requests.exceptions.RequestException as e:
-        print(colored(f"❌ Netzwerk-Fehler: {e}", Colors.RED))
-
-    return []
-
-
-def export_licenses(codes):
-    """Exportiert License Codes in eine CSV-Datei."""
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"licenses_{timestamp}.csv"
-
-    try:
-        with open(filename, 'w', newline='') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(['License Code', 'Created At', 'Status'])
-            for code in codes:
-                writer.writerow([code, datetime.now().strftime("%Y-%m-%d %H:%M"), 'Available'])
-
-        print(colored(f"✅ Codes exportiert nach: {filename}", Colors.GREEN))
-    except Exception as e:
-        print(colored(f"❌ Export fehlgeschlagen: {e}", Colors.RED))
-
-
-def export_all_licenses():
-    """Exportiert alle Lizenzen in eine CSV-Datei."""
-    url = f"{BASE_URL}/api/licenses"
-    headers = {"x-admin-key": ADMIN_KEY}
-
-    try:
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            licenses = response.json().get("licenses", [])
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"all_licenses_{timestamp}.csv"
-
-            with open(filename, 'w', newline='') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow(['Code', 'Status', 'Used By', 'Used At', 'Created At', 'Type'])
-                for lic in licenses:
-                    writer.writerow([
-                        lic.get('code'),
-                        'Used' if lic.get('is_used') else 'Available',
-                        lic.get('used_by_username', ''),
-                        format_date(lic.get('used_at')),
-                        format_date(lic.get('created_at')),
-                        lic.get('license_type', 'standard'),
-                    ])
-
-            print(colored(f"✅ {len(licenses)} Lizenzen exportiert nach: {filename}", Colors.GREEN))
-        else:
-            print(colored(f"❌ Fehler {response.status_code}", Colors.RED))
-    except Exception as e:
-        print(colored(f"❌ Export fehlgeschlagen: {e}", Colors.RED))
-
-
-def format_date(timestamp):
-    """Formatiert Timestamp für Anzeige."""
-    if not timestamp:
-        return "Unbekannt"
-    try:
-        if isinstance(timestamp, str):
-            # ISO-String oder Datumstext
-            try:
-                dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-            except ValueError:
-                return timestamp
-        else:
-            # Unix-Millisekunden
-            dt = datetime.fromtimestamp(timestamp / 1000)
-        return dt.strftime("%d.%m.%Y %H:%M")
-    except Exception:
-        return "Ungültig"
-
-
-def format_uptime(seconds: float):
-    """Formatiert Uptime in lesbare Form."""
-    try:
-        seconds = float(seconds)
-    except Exception:
-        return str(seconds)
-    days = int(seconds / 86400)
-    hours = int((seconds % 86400) / 3600)
-    minutes = int((seconds % 3600) / 60)
-
-    if days > 0:
-        return f"{days}d {hours}h {minutes}m"
-    if hours > 0:
-        return f"{hours}h {minutes}m"
-    return f"{minutes}m {int(seconds % 60)}s"
-
-
-def list_all_licenses():
-    """Zeigt alle verfügbaren Lizenzen an."""
-    url = f"{BASE_URL}/api/licenses"
-    headers = {"x-admin-key": ADMIN_KEY}
-    try:
-        print(colored("📋 Lade alle Lizenzen...", Colors.YELLOW))
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            licenses = response.json().get("licenses", [])
-            print(colored(f"\n📋 {len(licenses)} LIZENZEN GEFUNDEN", Colors.BOLD))
-            print("=" * 50)
-            for lic in licenses:
-                code = lic.get("code", "?")
-                license_type = lic.get("license_type", "standard")
-                created = format_date(lic.get("created_at"))
-                if lic.get("is_used"):
-                    username = lic.get("used_by_username", "Unknown")
-                    print(f"🔴 {code} ({license_type}) - Verwendet von {username} seit {created}")
-                else:
-                    print(f"🟢 {code} ({license_type}) - Verfügbar seit {created}")
-        else:
-            print(colored(f"❌ Fehler {response.status_code}", Colors.RED))
-    except requests.exceptions.RequestException as e:
-        print(colored(f"❌ Netzwerk-Fehler: {e}", Colors.RED))
-
-
-def list_all_users():
-    """Zeigt alle Benutzer an."""
-    url = f"{BASE_URL}/api/users"
-    headers = {"x-admin-key": ADMIN_KEY}
-    try:
-        print(colored("👥 Lade alle Benutzer...", Colors.YELLOW))
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            users = response.json().get("users", [])
-            print(colored(f"\n👥 {len(users)} BENUTZER GEFUNDEN", Colors.BOLD))
-            print("=" * 50)
-            for user in users:
-                username = user.get("username", "Unknown")
-                user_id = user.get("id", "N/A")
-                is_admin = user.get("is_admin", False)
-                created = format_date(user.get("created_at"))
-                last_login = format_date(user.get("last_login"))
-                role = "👑 Admin" if is_admin else "👤 User"
-                print(f"{role} {username} (ID: {user_id})")
-                print(f"    Erstellt: {created}")
-                print(f"    Letzter Login: {last_login}")
-                print()
-        else:
-            print(colored(f"❌ Fehler {response.status_code}", Colors.RED))
-    except requests.exceptions.RequestException as e:
-        print(colored(f"❌ Netzwerk-Fehler: {e}", Colors.RED))
-
-
-def list_all_tokens():
-    """Zeigt alle aktiven Tokens an."""
-    url = f"{BASE_URL}/api/tokens"
-    headers = {"x-admin-key": ADMIN_KEY}
-    try:
-        print(colored("🔑 Lade alle Tokens...", Colors.YELLOW))
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            tokens = response.json().get("tokens", [])
-            print(colored(f"\n🔑 {len(tokens)} TOKENS GEFUNDEN", Colors.BOLD))
-            print("=" * 50)
-            for token in tokens:
-                token_value = token.get("token", "N/A")
-                owner = token.get("owner", "Unknown")
-                queued = token.get("queued", 0)
-                print(f"🔑 Token {token_value} - {owner} (Queued: {queued})")
-                print()
-        else:
-            print(colored(f"❌ Fehler {response.status_code}", Colors.RED))
-    except requests.exceptions.RequestException as e:
-        print(colored(f"❌ Netzwerk-Fehler: {e}", Colors.RED))
-
-
-def get_database_stats():
-    """Zeigt Basis-Statistiken (abgeleitet), da kein /api/stats Endpoint existiert."""
-    try:
-        headers = {"x-admin-key": ADMIN_KEY}
-
-        users_resp = requests.get(f"{BASE_URL}/api/users", headers=headers, timeout=10)
-        users = users_resp.json().get("users", []) if users_resp.status_code == 200 else []
-
-        licenses_resp = requests.get(f"{BASE_URL}/api/licenses", headers=headers, timeout=10)
-        licenses = licenses_resp.json().get("licenses", []) if licenses_resp.status_code == 200 else []
-
-        tokens_resp = requests.get(f"{BASE_URL}/api/tokens", headers=headers, timeout=10)
-        tokens = tokens_resp.json().get("tokens", []) if tokens_resp.status_code == 200 else []
-
-        stats = {
-            "users": {
-                "total": len(users),
-                "admins": sum(1 for u in users if u.get("is_admin")),
-                "regular": sum(1 for u in users if not u.get("is_admin")),
-            },
-            "licenses": {
-                "total": len(licenses),
-                "used": sum(1 for l in licenses if l.get("is_used")),
-                "available": sum(1 for l in licenses if not l.get("is_used")),
-            },
-            "tokens": {"active": len(tokens)},
-            # Sessions/Force Queue werden serverseitig nicht aggregiert angeboten
-            "sessions": {},
-            "forces": {},
-        }
-
-        print(colored("\n📊 DATENBANK STATISTIKEN", Colors.BOLD))
-        print("=" * 50)
-        print(colored("\n👥 BENUTZER:", Colors.CYAN))
-        print(f"  Gesamt: {stats['users']['total']}")
-        print(f"  Admins: {stats['users']['admins']}")
-        print(f"  Regular: {stats['users']['regular']}")
-
-        print(colored("\n🎫 LIZENZEN:", Colors.CYAN))
-        print(f"  Gesamt: {stats['licenses']['total']}")
-        print(f"  Verwendet: {stats['licenses']['used']}")
-        print(f"  Verfügbar: {stats['licenses']['available']}")
-
-        print(colored("\n🔑 TOKENS:", Colors.CYAN))
-        print(f"  Aktiv: {stats['tokens']['active']}")
-
-        return stats
-    except requests.exceptions.RequestException as e:
-        print(colored(f"❌ Netzwerk-Fehler: {e}", Colors.RED))
-    except Exception as e:
-        print(colored(f"❌ Fehler beim Laden der Statistiken: {e}", Colors.RED))
-    return None
-
-
-def view_audit_log(limit: int = 50, user_id=None):
-    """Audit-Log Anzeige (nicht verfügbar)."""
-    print(colored("❌ Audit-Log Endpoint ist im Backend nicht verfügbar.", Colors.RED))
-
-
-def manage_user(username: str):
-    """Zeigt detaillierte Infos zu einem User und ermöglicht Verwaltung."""
-    url = f"{BASE_URL}/api/users"
-    headers = {"x-admin-key": ADMIN_KEY}
-    try:
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            users = response.json().get("users", [])
-            user = next((u for u in users if u.get("username") == username), None)
-            if not user:
-                print(colored(f"❌ User '{username}' nicht gefunden", Colors.RED))
-                return
-
-            print(colored(f"\n👤 USER DETAILS: {username}", Colors.BOLD))
-            print("=" * 50)
-            print(f"ID: {user.get('id')}")
-            print(f"Display Name: {user.get('display_name')}")
-            print(f"Email: {user.get('email', 'Nicht angegeben')}")
-            print(f"Admin: {'Ja' if user.get('is_admin') else 'Nein'}")
-            print(f"Erstellt: {format_date(user.get('created_at'))}")
-            print(f"Letzter Login: {format_date(user.get('last_login'))}")
-
-            print(colored("\n⚙️  AKTIONEN:", Colors.YELLOW))
-            print("1. Audit-Log anzeigen")
-            print("2. User deaktivieren")
-            print("3. Zurück")
-
-            choice = input("\nWähle (1-3): ").strip()
-            if choice == "1":
-                view_audit_log(50, user.get('id'))
-            elif choice == "2":
-                confirm = input(colored(f"\n⚠️  User '{username}' wirklich deaktivieren? (j/n): ", Colors.RED))
-                if confirm.lower() == 'j':
-                    deactivate_user(user.get('id'))
-        else:
-            print(colored(f"❌ Fehler {response.status_code}", Colors.RED))
-    except requests.exceptions.RequestException as e:
-        print(colored(f"❌ Netzwerk-Fehler: {e}", Colors.RED))
-
-
-def deactivate_user(user_id):
-    """Deaktiviert einen User (nicht unterstützt)."""
-    print(colored("❌ User-Deaktivierung wird vom Backend derzeit nicht unterstützt.", Colors.RED))
-
-
-def revoke_license(code: str):
-    """Widerruft eine Lizenz (nicht unterstützt)."""
-    print(colored("❌ Lizenz-Widerruf wird vom Backend derzeit nicht unterstützt.", Colors.RED))
-
-
-def search_licenses(search_term: str):
-    """Sucht nach Lizenzen nach Code oder Benutzername."""
-    url = f"{BASE_URL}/api/licenses"
-    headers = {"x-admin-key": ADMIN_KEY}
-    try:
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            licenses = response.json().get("licenses", [])
-            found = []
-            for lic in licenses:
-                code = lic.get("code", "")
-                used_by = lic.get("used_by_username", "") or ""
-                if search_term.upper() in code or search_term.lower() in used_by.lower():
-                    found.append(lic)
-
-            if found:
-                print(colored(f"\n🔍 {len(found)} Lizenz(en) gefunden:", Colors.GREEN))
-                for lic in found:
-                    code = lic.get("code", "?")
-                    if lic.get("is_used"):
-                        username = lic.get("used_by_username", "Unknown")
-                        print(f"  {code} - Verwendet von {username}")
-                    else:
-                        print(f"  {code} - Verfügbar")
-            else:
-                print(colored(f"❌ Keine Lizenzen für '{search_term}' gefunden", Colors.YELLOW))
-        else:
-            print(colored(f"❌ Fehler {response.status_code}", Colors.RED))
-    except requests.exceptions.RequestException as e:
-        print(colored(f"❌ Netzwerk-Fehler: {e}", Colors.RED))
-
-
-def batch_operations():
-    """Batch-Operationen Menü."""
-    print(colored("\n🔧 BATCH-OPERATIONEN", Colors.BOLD))
-    print("=" * 50)
-    print("1. 📤 Lizenzen aus CSV importieren (nicht verfügbar)")
-    print("2. 📥 Alle Lizenzen exportieren")
-    print("3. 🗑️  Alle ungenutzten Lizenzen löschen (nicht verfügbar)")
-    print("4. 📊 Vollständiger Datenbank-Export (nicht verfügbar)")
-    print("5. ↩️  Zurück")
-
-    choice = input("\nWähle (1-5): ").strip()
-    if choice == "1":
-        print(colored("❌ CSV-Import wird vom Backend derzeit nicht unterstützt.", Colors.RED))
-    elif choice == "2":
-        export_all_licenses()
-    elif choice == "3":
-        print(colored("❌ Löschen ungenutzter Lizenzen wird derzeit nicht unterstützt.", Colors.RED))
-    elif choice == "4":
-        print(colored("❌ Vollständiger DB-Export wird derzeit nicht unterstützt.", Colors.RED))
-
-
-def get_system_status():
-    """Prüft den System-Status."""
-    url = f"{BASE_URL}/api/status"
-    try:
-        response = requests.get(url, timeout=5)
-        if response.status_code == 200:
-            status = response.json()
-            print(colored("✅ Server ist online", Colors.GREEN))
-            if "uptime" in status:
-                uptime = format_uptime(status["uptime"]) if status.get("uptime") is not None else "—"
-                print(f"⏰ Uptime: {uptime}")
-            if "database" in status:
-                print(f"🗄️  Database: {status['database']}")
-            return True
-        else:
-            print(colored(f"❌ Server Fehler {response.status_code}", Colors.RED))
-            return False
-    except requests.exceptions.RequestException:
-        print(colored("❌ Server ist offline", Colors.RED))
-        return False
-
-
-def license_menu():
-    """License Management Untermenü."""
-    while True:
-        print(colored("\n🎫 LICENSE MANAGEMENT", Colors.BOLD))
-        print("=" * 50)
-        print("1. 📝 Neue Lizenz erstellen")
-        print("2. 📋 Alle Lizenzen anzeigen")
-        print("3. 🔍 Lizenz suchen")
-        print("4. 🗑️  Lizenz widerrufen")
-        print("5. ↩️  Zurück")
-
-        choice = input("\nWähle (1-5): ").strip()
-        if choice == "1":
-            try:
-                count = int(input("Anzahl (1-100): ") or "1")
-            except ValueError:
-                count = 1
-            create_license_codes(count)
-        elif choice == "2":
-            list_all_licenses()
-        elif choice == "3":
-            search_term = input("Suchbegriff: ")
-            search_licenses(search_term)
-        elif choice == "4":
-            code = input("License Code: ")
-            revoke_license(code)
-        elif choice == "5":
-            break
-
-
-def user_menu():
-    """User Management Untermenü."""
-    while True:
-        print(colored("\n👥 USER MANAGEMENT", Colors.BOLD))
-        print("=" * 50)
-        print("1. 📋 Alle User anzeigen")
-        print("2. 🔍 User Details")
-        print("3. 🎯 Alle Tokens anzeigen")
-        print("4. ↩️  Zurück")
-
-        choice = input("\nWähle (1-4): ").strip()
-        if choice == "1":
-            list_all_users()
-        elif choice == "2":
-            username = input("Username: ")
-            manage_user(username)
-        elif choice == "3":
-            list_all_tokens()
-        elif choice == "4":
-            break
-
-
-def stats_menu():
-    """Statistiken Untermenü."""
-    while True:
-        print(colored("\n📊 STATISTIKEN & REPORTS", Colors.BOLD))
-        print("=" * 50)
-        print("1. 📊 Datenbank-Statistiken")
-        print("2. 📈 Nutzungs-Report")
-        print("3. 🔄 Live-Monitoring")
-        print("4. ↩️  Zurück")
-
-        choice = input("\nWähle (1-4): ").strip()
-        if choice == "1":
-            get_database_stats()
-        elif choice == "2":
-            generate_usage_report()
-        elif choice == "3":
-            live_monitoring()
-        elif choice == "4":
-            break
-
-
-def generate_usage_report():
-    """Generiert einen Nutzungsbericht basierend auf aggregierten Statistiken."""
-    stats = get_database_stats()
-    if stats:
-        print(colored("\n📈 NUTZUNGSBERICHT", Colors.BOLD))
-        print("=" * 50)
-        licenses = stats.get("licenses", {})
-        total = licenses.get('total', 0)
-        used = licenses.get('used', 0)
-        if total > 0:
-            usage_rate = (used / max(total, 1)) * 100.0
-            print(f"License-Nutzungsrate: {colored(f'{usage_rate:.1f}%', Colors.CYAN)}")
-        print(f"Aktive Tokens: {stats.get('tokens', {}).get('active', 0)}")
-
-
-def live_monitoring():
-    """Live-Monitoring der Serveraktivität."""
-    print(colored("\n🔄 LIVE MONITORING (Drücke Ctrl+C zum Beenden)", Colors.YELLOW))
-    print("=" * 50)
-    try:
-        while True:
-            stats = get_database_stats()
-            if stats:
-                # Bildschirm "leeren"
-                print("\033[2J\033[H")
-                print(colored("🔄 LIVE MONITORING", Colors.BOLD))
-                print(f"Zeit: {datetime.now().strftime('%H:%M:%S')}")
-                print("-" * 30)
-                print(f"Users: {stats.get('users', {}).get('total', 0)}")
-                print(f"Lizenzen gesamt: {stats.get('licenses', {}).get('total', 0)}")
-                print(f"Lizenzen verwendet: {stats.get('licenses', {}).get('used', 0)}")
-                print(f"Aktive Tokens: {stats.get('tokens', {}).get('active', 0)}")
-            time.sleep(5)
-    except KeyboardInterrupt:
-        print(colored("\n✅ Monitoring beendet", Colors.GREEN))
-
-
-def main():
-    """Hauptfunktion - Erweitertes interaktives Menü."""
-    print(colored("🎩 Imperia Magic v3.0 - Enhanced Admin Tool", Colors.BOLD))
-    print("=" * 50)
-
-    # Hinweis, falls kein Admin-Key konfiguriert ist
-    if not ADMIN_KEY:
-        print(colored("⚠️  Kein ADMIN_KEY gesetzt. Admin-Endpunkte könnten ungeschützt sein.", Colors.YELLOW))
-
-    # System Status prüfen
-    if not get_system_status():
-        print(colored("\n⚠️  Server offline. Trotzdem fortfahren? (j/n)", Colors.YELLOW))
-        if input().lower() != 'j':
-            return
-
-    while True:
-        print(colored("\n🎯 HAUPTMENÜ", Colors.BOLD))
-        print("=" * 50)
-        print("1. 🎫 License Management")
-        print("2. 👥 User Management")
-        print("3. 📊 Statistiken & Reports")
-        print("4. 🔧 Batch-Operationen")
-        print("5. 📋 Audit Log")
-        print("6. 🔍 System Status")
-        print("7. ❌ Beenden")
-
-        choice = input("\nWähle (1-7): ").strip()
-        if choice == "1":
-            license_menu()
-        elif choice == "2":
-            user_menu()
-        elif choice == "3":
-            stats_menu()
-        elif choice == "4":
-            batch_operations()
-        elif choice == "5":
-            view_audit_log()
-        elif choice == "6":
-            get_system_status()
-            time.sleep(2)
-        elif choice == "7":
-            print(colored("👋 Auf Wiedersehen!", Colors.GREEN))
-            break
-        else:
-            print(colored("❌ Ungültige Auswahl", Colors.RED))
-
-
-if __name__ == "__main__":
-    main()
-
-#!/usr/bin/env python3
-"""
-License Code Creator für Imperia Magic Webapp v3.0
-Für Pythonista iOS App - Enhanced Admin Management Tool
-
-Aktualisiert, um mit dem aktuellen Backend kompatibel zu sein:
-- Endpunkte abgeglichen (keine /api/audit-log oder /api/stats Endpunkte)
-- ADMIN_KEY und Basis-URL über Umgebungsvariablen konfigurierbar
-- Token- und Lizenz-Schema angepasst
-"""
-
-import requests
-import json
-from datetime import datetime
-import csv
-import os
-import time
+def _env_days(name: str, default: int):
+    """Tage aus einer Umgebungsvariable; bei ungültigem Wert Warnung und Standardwert."""
+    value = os.environ.get(name, "").strip()
+    if not value:
+        return default
+    if not value.isdigit() or int(value) < 1:
+        print(f"⚠️  {name}={value!r} ist keine gültige Anzahl Tage, verwende {default}", file=sys.stderr)
+        return default
+    return int(value)
 
-# --- Konfiguration ---
-# Kann per Umgebungsvariablen überschrieben werden:
-#   - IMPERIA_BASE_URL: Basis-URL des Servers
-#   - ADMIN_KEY: Admin-Schlüssel für Admin-Endpunkte
-BASE_URL = os.environ.get("IMPERIA_BASE_URL", "https://imperia-magic.onrender.com")
-ADMIN_KEY = os.environ.get("ADMIN_KEY", "DevAdmin2025")
+
+RETENTION_POLICIES = {
+    "force_queue": _env_days("IMPERIA_RETENTION_QUEUE_DAYS", 7),
+    "audit_log": _env_days("IMPERIA_RETENTION_AUDIT_DAYS", 90),
+}
 
 
 # Farben für Terminal (optional)
@@ -647,6 +82,246 @@ def colored(text, color):
         return text
 
 
+# --- Resilienz ---
+# Der Server läuft auf Render und braucht nach Leerlauf teils mehrere
+# Sekunden bis zum ersten Request (Cold Start). Lesende GETs laufen daher
+# über resilient_get(): Warm-up abwarten, Retries mit Jitter, Hedging
+# langsamer Requests und ein Circuit Breaker pro Server.
+
+WARMUP_TIMEOUT = 60
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.5
+HEDGE_DELAY = 2.0
+HEDGE_POOL_WORKERS = 8
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_COOLDOWN = 30
+RETRYABLE_STATUS = {502, 503, 504}
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Server gilt als nicht erreichbar; Requests schlagen sofort fehl."""
+
+
+class CircuitBreaker:
+    """Öffnet nach mehreren Fehlschlägen in Folge und lässt erst nach einer
+    Abkühlphase wieder einen Probe-Request durch (half-open)."""
+
+    def __init__(self, threshold: int = BREAKER_FAILURE_THRESHOLD, cooldown: float = BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                # half-open: genau einen Probe-Request zulassen
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def retry_in(self):
+        with self._lock:
+            if self.opened_at is None:
+                return 0
+            return max(self.cooldown - (time.monotonic() - self.opened_at), 0)
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+class Warmup:
+    """Weckt den Server im Hintergrund über /health auf."""
+
+    def __init__(self, base_url: str, timeout: float = WARMUP_TIMEOUT):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.ok = False
+        self.done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        try:
+            response = requests.get(f"{self.base_url}/health", timeout=self.timeout)
+            self.ok = response.status_code == 200
+        except requests.exceptions.RequestException:
+            self.ok = False
+        finally:
+            self.done.set()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def wait(self):
+        return self.done.wait(self.timeout)
+
+
+_breakers = {}
+_warmups = {}
+_resilience_lock = threading.Lock()
+_hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_POOL_WORKERS)
+
+
+def breaker_for(base_url: str):
+    with _resilience_lock:
+        if base_url not in _breakers:
+            _breakers[base_url] = CircuitBreaker()
+        return _breakers[base_url]
+
+
+def start_warmup(base_url: str):
+    """Startet das Aufwecken des Servers (einmal pro Server)."""
+    with _resilience_lock:
+        if base_url not in _warmups:
+            _warmups[base_url] = Warmup(base_url).start()
+        return _warmups[base_url]
+
+
+def _remaining(deadline):
+    """Restzeit bis zur Deadline (time.monotonic()), None ohne Deadline."""
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def _hedged_get(url: str, deadline=None, **kwargs):
+    """Sendet nach HEDGE_DELAY einen zweiten identischen Request, falls der
+    erste noch läuft, und nimmt die erste erfolgreiche Antwort."""
+    futures = [_hedge_pool.submit(requests.get, url, **kwargs)]
+    hedge_delay = HEDGE_DELAY
+    if deadline is not None:
+        hedge_delay = min(hedge_delay, max(_remaining(deadline), 0))
+    done, _ = wait(futures, timeout=hedge_delay)
+    if not done and (deadline is None or _remaining(deadline) > 0):
+        futures.append(_hedge_pool.submit(requests.get, url, **kwargs))
+
+    error = None
+    pending = set(futures)
+    while pending:
+        remaining = _remaining(deadline)
+        done, pending = wait(pending, timeout=None if remaining is None else max(remaining, 0),
+                             return_when=FIRST_COMPLETED)
+        if not done:
+            raise requests.exceptions.Timeout(f"Deadline überschritten: {url}")
+        for future in done:
+            try:
+                return future.result()
+            except requests.exceptions.RequestException as e:
+                error = e
+    raise error
+
+
+def resilient_get(base_url: str, path: str, headers=None, params=None, timeout=DEFAULT_TIMEOUT,
+                  deadline=None, hedge=True):
+    """Idempotenter GET mit Warm-up, Retries (Backoff mit Jitter), Hedging und Circuit Breaker.
+
+    deadline (time.monotonic()) begrenzt den gesamten Aufruf inklusive
+    Retries, Backoff und Hedge; kein Versuch läuft darüber hinaus. Mit
+    hedge=False läuft der Request ohne zweiten Request im eigenen Thread,
+    z.B. in fan_out, wo der gemeinsame _hedge_pool sonst zu klein wäre.
+    """
+    warmup = _warmups.get(base_url)
+    if warmup is not None and not warmup.done.is_set():
+        remaining = _remaining(deadline)
+        warmup.done.wait(warmup.timeout if remaining is None else max(min(warmup.timeout, remaining), 0))
+
+    breaker = breaker_for(base_url)
+    url = f"{base_url}{path}"
+    error = None
+    response = None
+    for attempt in range(RETRY_ATTEMPTS):
+        if not breaker.allow_request():
+            raise CircuitOpenError(
+                f"Server nicht erreichbar, neuer Versuch in {breaker.retry_in():.0f}s")
+        remaining = _remaining(deadline)
+        if remaining is not None and remaining <= 0:
+            error = error or requests.exceptions.Timeout(f"Deadline überschritten: {url}")
+            break
+        attempt_timeout = timeout if remaining is None else min(timeout, remaining)
+        try:
+            if hedge:
+                response = _hedged_get(url, deadline=deadline, headers=headers, params=params,
+                                       timeout=attempt_timeout)
+            else:
+                response = requests.get(url, headers=headers, params=params, timeout=attempt_timeout)
+            if response.status_code not in RETRYABLE_STATUS:
+                breaker.record_success()
+                return response
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            error = e
+        if attempt < RETRY_ATTEMPTS - 1:
+            # "Full Jitter": zufällige Wartezeit bis zum exponentiellen Maximum
+            delay = random.uniform(0, RETRY_BASE_DELAY * 2 ** attempt)
+            remaining = _remaining(deadline)
+            if remaining is not None and delay >= remaining:
+                break
+            time.sleep(delay)
+
+    # Der Breaker zählt fehlgeschlagene Aufrufe, nicht einzelne Versuche
+    breaker.record_failure()
+    if response is not None:
+        return response
+    raise error
+
+
+# --- API-Helfer ---
+
+# Listen im kompakten Format anfordern: Spaltennamen einmal, Zeilen als Arrays
+COMPACT_LIST_PARAMS = {"shape": "compact"}
+
+
+def default_instance():
+    """Instanz aus IMPERIA_BASE_URL und ADMIN_KEY."""
+    return {"name": "default", "base_url": BASE_URL, "admin_key": ADMIN_KEY, "timeout": DEFAULT_TIMEOUT}
+
+
+def admin_get(path: str, params=None, instance=None, timeout=None):
+    """GET auf einen Admin-Endpunkt (über resilient_get).
+
+    Die Antwortkompression (gzip/deflate, br falls brotli installiert ist)
+    handelt requests über Accept-Encoding aus und entpackt transparent.
+    """
+    instance = instance or default_instance()
+    return resilient_get(
+        instance["base_url"],
+        path,
+        headers={"x-admin-key": instance["admin_key"]},
+        params=params,
+        timeout=timeout or instance["timeout"],
+        deadline=instance.get("deadline"),
+        hedge=instance.get("hedge", True),
+    )
+
+
+def decode_list(payload: dict, key: str):
+    """Liest eine Admin-Liste aus dem normalen oder kompakten Antwortformat."""
+    rows = payload.get(key, [])
+    if payload.get("shape") == "compact":
+        columns = payload.get("columns", [])
+        return [dict(zip(columns, row)) for row in rows]
+    return rows
+
+
+def fetch_admin_list(path: str, key: str, instance=None):
+    """Lädt eine Admin-Liste (z.B. /api/users -> "users")."""
+    response = admin_get(path, params=COMPACT_LIST_PARAMS, instance=instance)
+    if response.status_code != 200:
+        raise RuntimeError(f"Fehler {response.status_code}")
+    return decode_list(response.json(), key)
+
+
 def create_license_codes(count: int = 1):
     """Erstellt neue License Codes.
 
@@ -717,13 +392,11 @@ def export_licenses(codes):
 
 def export_all_licenses():
     """Exportiert alle Lizenzen in eine CSV-Datei."""
-    url = f"{BASE_URL}/api/licenses"
-    headers = {"x-admin-key": ADMIN_KEY}
 
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = admin_get("/api/licenses", params=COMPACT_LIST_PARAMS)
         if response.status_code == 200:
-            licenses = response.json().get("licenses", [])
+            licenses = decode_list(response.json(), "licenses")
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"all_licenses_{timestamp}.csv"
 
@@ -785,13 +458,11 @@ def format_uptime(seconds: float):
 
 def list_all_licenses():
     """Zeigt alle verfügbaren Lizenzen an."""
-    url = f"{BASE_URL}/api/licenses"
-    headers = {"x-admin-key": ADMIN_KEY}
     try:
         print(colored("📋 Lade alle Lizenzen...", Colors.YELLOW))
-        response = requests.get(url, headers=headers, timeout=10)
+        response = admin_get("/api/licenses", params=COMPACT_LIST_PARAMS)
         if response.status_code == 200:
-            licenses = response.json().get("licenses", [])
+            licenses = decode_list(response.json(), "licenses")
             print(colored(f"\n📋 {len(licenses)} LIZENZEN GEFUNDEN", Colors.BOLD))
             print("=" * 50)
             for lic in licenses:
@@ -811,13 +482,11 @@ def list_all_licenses():
 
 def list_all_users():
     """Zeigt alle Benutzer an."""
-    url = f"{BASE_URL}/api/users"
-    headers = {"x-admin-key": ADMIN_KEY}
     try:
         print(colored("👥 Lade alle Benutzer...", Colors.YELLOW))
-        response = requests.get(url, headers=headers, timeout=10)
+        response = admin_get("/api/users", params=COMPACT_LIST_PARAMS)
         if response.status_code == 200:
-            users = response.json().get("users", [])
+            users = decode_list(response.json(), "users")
             print(colored(f"\n👥 {len(users)} BENUTZER GEFUNDEN", Colors.BOLD))
             print("=" * 50)
             for user in users:
@@ -839,13 +508,11 @@ def list_all_users():
 
 def list_all_tokens():
     """Zeigt alle aktiven Tokens an."""
-    url = f"{BASE_URL}/api/tokens"
-    headers = {"x-admin-key": ADMIN_KEY}
     try:
         print(colored("🔑 Lade alle Tokens...", Colors.YELLOW))
-        response = requests.get(url, headers=headers, timeout=10)
+        response = admin_get("/api/tokens", params=COMPACT_LIST_PARAMS)
         if response.status_code == 200:
-            tokens = response.json().get("tokens", [])
+            tokens = decode_list(response.json(), "tokens")
             print(colored(f"\n🔑 {len(tokens)} TOKENS GEFUNDEN", Colors.BOLD))
             print("=" * 50)
             for token in tokens:
@@ -860,36 +527,39 @@ def list_all_tokens():
         print(colored(f"❌ Netzwerk-Fehler: {e}", Colors.RED))
 
 
+def compute_stats(users, licenses, tokens):
+    """Aggregiert Statistiken aus den Listen von /api/users, /api/licenses und /api/tokens."""
+    return {
+        "users": {
+            "total": len(users),
+            "admins": sum(1 for u in users if u.get("is_admin")),
+            "regular": sum(1 for u in users if not u.get("is_admin")),
+        },
+        "licenses": {
+            "total": len(licenses),
+            "used": sum(1 for l in licenses if l.get("is_used")),
+            "available": sum(1 for l in licenses if not l.get("is_used")),
+        },
+        "tokens": {"active": len(tokens)},
+        # Sessions/Force Queue werden serverseitig nicht aggregiert angeboten
+        "sessions": {},
+        "forces": {},
+    }
+
+
 def get_database_stats():
     """Zeigt Basis-Statistiken (abgeleitet), da kein /api/stats Endpoint existiert."""
     try:
-        headers = {"x-admin-key": ADMIN_KEY}
-
-        users_resp = requests.get(f"{BASE_URL}/api/users", headers=headers, timeout=10)
-        users = users_resp.json().get("users", []) if users_resp.status_code == 200 else []
-
-        licenses_resp = requests.get(f"{BASE_URL}/api/licenses", headers=headers, timeout=10)
-        licenses = licenses_resp.json().get("licenses", []) if licenses_resp.status_code == 200 else []
-
-        tokens_resp = requests.get(f"{BASE_URL}/api/tokens", headers=headers, timeout=10)
-        tokens = tokens_resp.json().get("tokens", []) if tokens_resp.status_code == 200 else []
-
-        stats = {
-            "users": {
-                "total": len(users),
-                "admins": sum(1 for u in users if u.get("is_admin")),
-                "regular": sum(1 for u in users if not u.get("is_admin")),
-            },
-            "licenses": {
-                "total": len(licenses),
-                "used": sum(1 for l in licenses if l.get("is_used")),
-                "available": sum(1 for l in licenses if not l.get("is_used")),
-            },
-            "tokens": {"active": len(tokens)},
-            # Sessions/Force Queue werden serverseitig nicht aggregiert angeboten
-            "sessions": {},
-            "forces": {},
-        }
+        users_resp = admin_get("/api/users", params=COMPACT_LIST_PARAMS)
+        users = decode_list(users_resp.json(), "users") if users_resp.status_code == 200 else []
+
+        licenses_resp = admin_get("/api/licenses", params=COMPACT_LIST_PARAMS)
+        licenses = decode_list(licenses_resp.json(), "licenses") if licenses_resp.status_code == 200 else []
+
+        tokens_resp = admin_get("/api/tokens", params=COMPACT_LIST_PARAMS)
+        tokens = decode_list(tokens_resp.json(), "tokens") if tokens_resp.status_code == 200 else []
+
+        stats = compute_stats(users, licenses, tokens)
 
         print(colored("\n📊 DATENBANK STATISTIKEN", Colors.BOLD))
         print("=" * 50)
@@ -914,69 +584,512 @@ def get_database_stats():
     return None
 
 
-def view_audit_log(limit: int = 50, user_id=None):
-    """Audit-Log Anzeige (nicht verfügbar)."""
-    print(colored("❌ Audit-Log Endpoint ist im Backend nicht verfügbar.", Colors.RED))
+AUDIT_PAGE_SIZE = 50
+
+
+def _fetch_audit_page(filters: dict, before=None, after=None, limit: int = AUDIT_PAGE_SIZE):
+    """Lädt eine Seite aus /api/audit-log (Keyset-Pagination)."""
+    params = {k: v for k, v in filters.items() if v}
+    params["limit"] = limit
+    # 0 ist ein gültiger Cursor (leeres Log), nur None heißt "kein Cursor"
+    if before is not None:
+        params["before"] = before
+    if after is not None:
+        params["after"] = after
+    response = admin_get("/api/audit-log", params=params)
+    if response.status_code != 200:
+        raise RuntimeError(f"Fehler {response.status_code}")
+    return response.json()
+
+
+def iter_audit_log(filters: dict, page_size: int = AUDIT_PAGE_SIZE):
+    """Liefert Audit-Einträge (neueste zuerst); Seiten werden erst bei Bedarf geladen."""
+    cursor = None
+    while True:
+        page = _fetch_audit_page(filters, before=cursor, limit=page_size)
+        yield from page.get("entries", [])
+        cursor = page.get("nextCursor")
+        if not cursor:
+            return
+
+
+def format_audit_entry(entry: dict):
+    """Formatiert einen Audit-Eintrag als einzeilige Ausgabe."""
+    who = entry.get("username") or (f"User {entry['user_id']}" if entry.get("user_id") else "System")
+    details = entry.get("details")
+    if isinstance(details, dict):
+        details = ", ".join(f"{k}={v}" for k, v in details.items() if not isinstance(v, (dict, list)))
+    line = f"#{entry.get('id')} {format_date(entry.get('created_at'))} {colored(entry.get('action'), Colors.CYAN)} - {who}"
+    return f"{line} ({details})" if details else line
+
+
+def follow_audit_log(filters: dict, since_id=None, interval: float = 2.0):
+    """Zeigt neue Audit-Einträge fortlaufend an (Ctrl+C zum Beenden)."""
+    print(colored("\n👀 Folge dem Audit-Log (Ctrl+C zum Beenden)", Colors.YELLOW))
+    if since_id is None:
+        latest = _fetch_audit_page(filters, limit=1).get("entries", [])
+        since_id = latest[0]["id"] if latest else 0
+    try:
+        while True:
+            page = _fetch_audit_page(filters, after=since_id, limit=200)
+            for entry in page.get("entries", []):
+                print(format_audit_entry(entry))
+                since_id = entry["id"]
+            if not page.get("nextCursor"):
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        print(colored("\n✅ Audit-Log Verfolgung beendet", Colors.GREEN))
+
+
+def view_audit_log(limit: int = AUDIT_PAGE_SIZE, user_id=None, action=None, since=None, until=None):
+    """Zeigt das Audit-Log seitenweise an.
+
+    Args:
+        limit: Einträge pro Seite
+        user_id: Nur Einträge dieses Users
+        action: Nur Einträge dieser Aktion (z.B. force_created)
+        since/until: Zeitraum (YYYY-MM-DD oder ISO-Zeitstempel)
+    """
+    filters = {"userId": user_id, "action": action, "since": since, "until": until}
+    newest_id = None
+    shown = 0
+    try:
+        for entry in iter_audit_log(filters, page_size=limit):
+            if newest_id is None:
+                newest_id = entry.get("id")
+                print(colored("\n📋 AUDIT LOG", Colors.BOLD))
+                print("=" * 50)
+            print(format_audit_entry(entry))
+            shown += 1
+            if shown % limit == 0:
+                choice = input("\n[Enter] weiter, (f) folgen, (q) beenden: ").strip().lower()
+                if choice == "f":
+                    follow_audit_log(filters, since_id=newest_id)
+                    return
+                if choice == "q":
+                    return
+
+        if shown == 0:
+            print(colored("ℹ️  Keine Audit-Einträge gefunden", Colors.YELLOW))
+        if input("\n(f) neuen Einträgen folgen, [Enter] zurück: ").strip().lower() == "f":
+            follow_audit_log(filters, since_id=newest_id or 0)
+    except requests.exceptions.RequestException as e:
+        print(colored(f"❌ Netzwerk-Fehler: {e}", Colors.RED))
+    except RuntimeError as e:
+        print(colored(f"❌ {e}", Colors.RED))
+
+
+def audit_log_menu():
+    """Audit-Log mit optionalen Filtern anzeigen."""
+    print(colored("\n📋 AUDIT LOG", Colors.BOLD))
+    print("=" * 50)
+    print("Filter leer lassen, um alle Einträge anzuzeigen.")
+    action = input("Aktion (z.B. force_created): ").strip() or None
+    user_id = input("User-ID: ").strip() or None
+    since = input("Von (YYYY-MM-DD): ").strip() or None
+    until = input("Bis (YYYY-MM-DD): ").strip() or None
+    view_audit_log(user_id=user_id, action=action, since=since, until=until)
+
+
+# --- Lokaler Join-Index ---
+# Einmal aus den Snapshots von /api/users, /api/licenses und /api/tokens
+# aufgebaut; User-Details sind danach reine Dict-Lookups ohne Download.
+
+INDEX_MAX_AGE = 300
+
+
+class AdminIndex:
+    """Hash-Index über Users, Lizenzen und Tokens eines Snapshots."""
+
+    def __init__(self, users, licenses, tokens):
+        self.built_at = time.monotonic()
+        self.users_by_name = {u.get("username"): u for u in users}
+        self.users_by_id = {u.get("id"): u for u in users}
+        self.licenses_by_user = defaultdict(list)
+        self.tokens_by_user = defaultdict(list)
+        self.queue_depth = Counter()
+
+        for lic in licenses:
+            user_id = lic.get("used_by_user_id")
+            if user_id is not None:
+                self.licenses_by_user[user_id].append(lic)
+
+        for token in tokens:
+            user_id = token.get("user_id")
+            if user_id is None:
+                # Ältere Server liefern nur den Owner-Namen
+                user_id = self.users_by_name.get(token.get("owner"), {}).get("id")
+            if user_id is None:
+                continue
+            self.tokens_by_user[user_id].append(token)
+            self.queue_depth[user_id] += token.get("queued", 0) or 0
+
+    @property
+    def age(self):
+        return time.monotonic() - self.built_at
+
+    def user_detail(self, username: str):
+        """User inklusive Lizenzen, Tokens und Queue-Tiefe, oder None."""
+        user = self.users_by_name.get(username)
+        if user is None:
+            return None
+        user_id = user.get("id")
+        return {
+            "user": user,
+            "licenses": self.licenses_by_user.get(user_id, []),
+            "tokens": self.tokens_by_user.get(user_id, []),
+            "queued": self.queue_depth.get(user_id, 0),
+        }
+
+    def apply_event(self, event: dict):
+        """Hält den Index anhand eines Server-Events aktuell."""
+        data = event.get("data", {})
+        user_id = data.get("userId")
+        if event["type"] == "license_redeemed":
+            if user_id not in self.users_by_id:
+                # Einlösung erfolgt bei der Registrierung, der User ist also neu
+                user = {"id": user_id, "username": data.get("username"), "is_admin": 0}
+                self.users_by_id[user_id] = user
+                self.users_by_name[user["username"]] = user
+            self.licenses_by_user[user_id].append({
+                "code": data.get("code"),
+                "is_used": 1,
+                "used_by_user_id": user_id,
+                "used_by_username": data.get("username"),
+                "used_at": data.get("timestamp"),
+            })
+        elif event["type"] == "token_created":
+            self.tokens_by_user[user_id].append({
+                "token": data.get("token"),
+                "user_id": user_id,
+                "owner": data.get("username"),
+                "queued": 0,
+            })
+        elif event["type"] in ("force_queued", "force_acked"):
+            delta = data.get("count", 1) if event["type"] == "force_queued" else -data.get("count", 1)
+            for token in self.tokens_by_user.get(user_id, []):
+                if token.get("token") == data.get("token"):
+                    token["queued"] = max((token.get("queued") or 0) + delta, 0)
+            self.queue_depth[user_id] = max(self.queue_depth[user_id] + delta, 0)
+
+
+_admin_index = None
+
+
+def get_admin_index(refresh: bool = False):
+    """Liefert den lokalen Index; lädt die drei Listen parallel neu, wenn nötig."""
+    global _admin_index
+    if _admin_index is not None and not refresh and _admin_index.age < INDEX_MAX_AGE:
+        return _admin_index
+
+    print(colored("🔄 Lade Index (Users, Lizenzen, Tokens)...", Colors.YELLOW))
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        users = pool.submit(fetch_admin_list, "/api/users", "users")
+        licenses = pool.submit(fetch_admin_list, "/api/licenses", "licenses")
+        tokens = pool.submit(fetch_admin_list, "/api/tokens", "tokens")
+        _admin_index = AdminIndex(users.result(), licenses.result(), tokens.result())
+    return _admin_index
 
 
 def manage_user(username: str):
     """Zeigt detaillierte Infos zu einem User und ermöglicht Verwaltung."""
-    url = f"{BASE_URL}/api/users"
+    try:
+        index = get_admin_index()
+    except requests.exceptions.RequestException as e:
+        print(colored(f"❌ Netzwerk-Fehler: {e}", Colors.RED))
+        return
+    except RuntimeError as e:
+        print(colored(f"❌ {e}", Colors.RED))
+        return
+
+    detail = index.user_detail(username)
+    if not detail:
+        print(colored(f"❌ User '{username}' nicht gefunden", Colors.RED))
+        return
+    user = detail["user"]
+
+    print(colored(f"\n👤 USER DETAILS: {username}", Colors.BOLD))
+    print("=" * 50)
+    print(f"ID: {user.get('id')}")
+    print(f"Display Name: {user.get('display_name')}")
+    print(f"Email: {user.get('email', 'Nicht angegeben')}")
+    print(f"Admin: {'Ja' if user.get('is_admin') else 'Nein'}")
+    print(f"Erstellt: {format_date(user.get('created_at'))}")
+    print(f"Letzter Login: {format_date(user.get('last_login'))}")
+
+    print(colored(f"\n🎫 LIZENZEN ({len(detail['licenses'])}):", Colors.CYAN))
+    for lic in detail["licenses"]:
+        print(f"  {lic.get('code')} ({lic.get('license_type', 'standard')}) - "
+              f"eingelöst {format_date(lic.get('used_at'))}")
+
+    print(colored(f"\n🔑 TOKENS ({len(detail['tokens'])}), Queue gesamt: {detail['queued']}", Colors.CYAN))
+    for token in detail["tokens"]:
+        print(f"  {token.get('token')} - Queued: {token.get('queued', 0)}")
+    print(colored(f"\n(Index-Stand: vor {index.age:.0f}s)", Colors.BLUE))
+
+    print(colored("\n⚙️  AKTIONEN:", Colors.YELLOW))
+    print("1. Audit-Log anzeigen")
+    print("2. User deaktivieren")
+    print("3. Zurück")
+
+    choice = input("\nWähle (1-3): ").strip()
+    if choice == "1":
+        view_audit_log(50, user.get('id'))
+    elif choice == "2":
+        confirm = input(colored(f"\n⚠️  User '{username}' wirklich deaktivieren? (j/n): ", Colors.RED))
+        if confirm.lower() == 'j':
+            deactivate_user(user.get('id'))
+
+
+def deactivate_user(user_id):
+    """Deaktiviert einen User; seine Tokens und Sessions werden sofort ungültig."""
+    global _admin_index
+    url = f"{BASE_URL}/api/users/{user_id}/deactivate"
     headers = {"x-admin-key": ADMIN_KEY}
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = requests.post(url, headers=headers, timeout=DEFAULT_TIMEOUT)
         if response.status_code == 200:
-            users = response.json().get("users", [])
-            user = next((u for u in users if u.get("username") == username), None)
-            if not user:
-                print(colored(f"❌ User '{username}' nicht gefunden", Colors.RED))
-                return
+            print(colored("✅ User deaktiviert", Colors.GREEN))
+            _admin_index = None
+        elif response.status_code == 404:
+            print(colored("❌ User nicht gefunden oder bereits deaktiviert", Colors.RED))
+        else:
+            print(colored(f"❌ Fehler {response.status_code}: {response.text}", Colors.RED))
+    except requests.exceptions.RequestException as e:
+        print(colored(f"❌ Netzwerk-Fehler: {e}", Colors.RED))
 
-            print(colored(f"\n👤 USER DETAILS: {username}", Colors.BOLD))
-            print("=" * 50)
-            print(f"ID: {user.get('id')}")
-            print(f"Display Name: {user.get('display_name')}")
-            print(f"Email: {user.get('email', 'Nicht angegeben')}")
-            print(f"Admin: {'Ja' if user.get('is_admin') else 'Nein'}")
-            print(f"Erstellt: {format_date(user.get('created_at'))}")
-            print(f"Letzter Login: {format_date(user.get('last_login'))}")
-
-            print(colored("\n⚙️  AKTIONEN:", Colors.YELLOW))
-            print("1. Audit-Log anzeigen")
-            print("2. User deaktivieren")
-            print("3. Zurück")
-
-            choice = input("\nWähle (1-3): ").strip()
-            if choice == "1":
-                view_audit_log(50, user.get('id'))
-            elif choice == "2":
-                confirm = input(colored(f"\n⚠️  User '{username}' wirklich deaktivieren? (j/n): ", Colors.RED))
-                if confirm.lower() == 'j':
-                    deactivate_user(user.get('id'))
+
+PURGE_BATCH_SIZE = 500
+
+
+def _purge_request(license_filter: dict, dry_run: bool = False):
+    """Sendet einen einzelnen Purge-Batch an den Server."""
+    url = f"{BASE_URL}/api/licenses/purge"
+    headers = {
+        "Content-Type": "application/json",
+        "x-admin-key": ADMIN_KEY,
+    }
+    data = {"filter": license_filter, "dryRun": dry_run, "limit": PURGE_BATCH_SIZE}
+    response = requests.post(url, headers=headers, json=data, timeout=30)
+    if response.status_code != 200:
+        raise RuntimeError(f"Fehler {response.status_code}: {response.text}")
+    return response.json()
+
+
+def purge_licenses(license_filter: dict, dry_run: bool = False):
+    """Löscht alle Lizenzen, die dem Filter entsprechen, in Server-Batches.
+
+    Args:
+        license_filter: {"unused": bool, "type": str, "createdBefore": "YYYY-MM-DD",
+            "codes": [...]} - Kriterien werden UND-verknüpft
+        dry_run: Nur die Anzahl betroffener Lizenzen ermitteln
+
+    Returns:
+        Anzahl gelöschter (bzw. bei dry_run betroffener) Lizenzen, None bei Fehler
+    """
+    codes = license_filter.get("codes")
+    try:
+        if codes is not None:
+            # Code-Listen werden in Blöcken übertragen, nie ein Request pro Code
+            chunks = [codes[i:i + PURGE_BATCH_SIZE] for i in range(0, len(codes), PURGE_BATCH_SIZE)]
+            filters = [dict(license_filter, codes=chunk) for chunk in chunks]
         else:
-            print(colored(f"❌ Fehler {response.status_code}", Colors.RED))
+            filters = [license_filter]
+
+        if dry_run:
+            return sum(_purge_request(f, dry_run=True).get("matched", 0) for f in filters)
+
+        total = sum(_purge_request(f, dry_run=True).get("matched", 0) for f in filters)
+        deleted = 0
+        for f in filters:
+            while True:
+                result = _purge_request(f)
+                deleted += result.get("deleted", 0)
+                print(f"  🗑️  {deleted}/{total} gelöscht", end="\r", flush=True)
+                if result.get("deleted", 0) == 0 or result.get("remaining", 0) == 0:
+                    break
+        print()
+        return deleted
     except requests.exceptions.RequestException as e:
         print(colored(f"❌ Netzwerk-Fehler: {e}", Colors.RED))
+    except RuntimeError as e:
+        print(colored(f"❌ {e}", Colors.RED))
+    return None
 
 
-def deactivate_user(user_id):
-    """Deaktiviert einen User (nicht unterstützt)."""
-    print(colored("❌ User-Deaktivierung wird vom Backend derzeit nicht unterstützt.", Colors.RED))
+def purge_licenses_interactive(license_filter: dict):
+    """Zeigt die Anzahl betroffener Lizenzen und löscht nach Bestätigung."""
+    matched = purge_licenses(license_filter, dry_run=True)
+    if matched is None:
+        return
+    if matched == 0:
+        print(colored("ℹ️  Keine passenden Lizenzen gefunden", Colors.YELLOW))
+        return
+
+    confirm = input(colored(f"\n⚠️  {matched} Lizenz(en) wirklich löschen? (j/n): ", Colors.RED))
+    if confirm.lower() != 'j':
+        return
+
+    deleted = purge_licenses(license_filter)
+    if deleted is not None:
+        print(colored(f"✅ {deleted} Lizenz(en) gelöscht", Colors.GREEN))
 
 
 def revoke_license(code: str):
-    """Widerruft eine Lizenz (nicht unterstützt)."""
-    print(colored("❌ Lizenz-Widerruf wird vom Backend derzeit nicht unterstützt.", Colors.RED))
+    """Widerruft eine noch nicht verwendete Lizenz."""
+    code = code.strip().upper()
+    if not code:
+        return
+    purge_licenses_interactive({"codes": [code], "unused": True})
+
+
+def purge_menu():
+    """Filter für das Löschen von Lizenzen abfragen."""
+    print(colored("\n🗑️  LIZENZEN LÖSCHEN", Colors.BOLD))
+    print("=" * 50)
+    print("1. Alle ungenutzten Lizenzen")
+    print("2. Ungenutzte Lizenzen nach Typ")
+    print("3. Ungenutzte Lizenzen erstellt vor Datum")
+    print("4. Lizenzen aus Code-Liste (CSV oder kommagetrennt)")
+    print("5. ↩️  Zurück")
+
+    choice = input("\nWähle (1-5): ").strip()
+    license_filter = {"unused": True}
+    if choice == "2":
+        license_filter["type"] = input("Lizenz-Typ (z.B. standard): ").strip()
+        if not license_filter["type"]:
+            return
+    elif choice == "3":
+        date_str = input("Erstellt vor (YYYY-MM-DD): ").strip()
+        try:
+            datetime.strptime(date_str, "%Y-%m-%d")
+        except ValueError:
+            print(colored("❌ Ungültiges Datum", Colors.RED))
+            return
+        license_filter["createdBefore"] = date_str
+    elif choice == "4":
+        source = input("CSV-Datei oder Codes: ").strip()
+        codes = read_license_codes(source)
+        if not codes:
+            print(colored("❌ Keine Codes angegeben", Colors.RED))
+            return
+        license_filter["codes"] = codes
+        if input("Auch bereits verwendete Lizenzen löschen? (j/n): ").lower() == 'j':
+            del license_filter["unused"]
+    elif choice != "1":
+        return
+
+    purge_licenses_interactive(license_filter)
+
+
+def read_license_codes(source: str):
+    """Liest Codes aus einer CSV-Datei (erste Spalte) oder einer kommagetrennten Liste."""
+    codes = []
+    if os.path.isfile(source):
+        with open(source, newline='') as csvfile:
+            for row in csv.reader(csvfile):
+                if row and row[0].strip() and row[0].strip().lower() not in ('code', 'license code'):
+                    codes.append(row[0].strip().upper())
+    else:
+        codes = [c.strip().upper() for c in source.split(",") if c.strip()]
+    # Duplikate entfernen, Reihenfolge beibehalten
+    return list(dict.fromkeys(codes))
+
+
+# --- Force-Queue (Batch) ---
+# Für geskriptete Shows: mehrere Forces pro Request senden/bestätigen statt
+# einem Request pro Force. Der Server verarbeitet jeden Batch in einer
+# Transaktion. Die Funktionen werfen RuntimeError bzw. RequestException,
+# damit Skripte selbst entscheiden können, wie sie reagieren.
+
+FORCE_BATCH_SIZE = 100
+
+
+def _force_request(path: str, data: dict):
+    """POST an einen Token-Endpunkt (kein Admin-Key nötig)."""
+    response = requests.post(f"{BASE_URL}{path}", json=data, timeout=DEFAULT_TIMEOUT)
+    if response.status_code == 404:
+        raise RuntimeError("Token nicht gefunden")
+    if response.status_code != 200:
+        raise RuntimeError(f"Fehler {response.status_code}: {response.text}")
+    return response.json()
+
+
+def push_forces(token: str, forces):
+    """Stellt Forces in die Queue des Tokens; liefert (Force-IDs, Queue-Länge)."""
+    ids, queued = [], 0
+    for i in range(0, len(forces), FORCE_BATCH_SIZE):
+        result = _force_request(f"/api/data/{token}/batch", {"forces": forces[i:i + FORCE_BATCH_SIZE]})
+        ids.extend(result.get("ids", []))
+        queued = result.get("queued", queued)
+    return ids, queued
+
+
+def ack_forces(token: str, force_ids):
+    """Bestätigt Forces; liefert (bestätigte IDs, unbekannte/bereits bestätigte IDs)."""
+    acknowledged, missing = [], []
+    for i in range(0, len(force_ids), FORCE_BATCH_SIZE):
+        result = _force_request(f"/api/ack/{token}/batch", {"forceIds": force_ids[i:i + FORCE_BATCH_SIZE]})
+        acknowledged.extend(result.get("acknowledged", []))
+        missing.extend(result.get("missing", []))
+    return acknowledged, missing
+
+
+def drain_forces(token: str, limit: int = FORCE_BATCH_SIZE):
+    """Holt offene Forces und bestätigt sie in einem Schritt (älteste zuerst)."""
+    return _force_request(f"/api/drain/{token}", {"limit": limit}).get("queue", [])
+
+
+def load_show_script(path: str):
+    """Liest ein Show-Skript: JSON-Liste von Forces oder {"forces": [...]}."""
+    with open(path, encoding="utf-8") as f:
+        script = json.load(f)
+    forces = script.get("forces", []) if isinstance(script, dict) else script
+    if not isinstance(forces, list) or not all(isinstance(force, dict) and force.get("mode") for force in forces):
+        raise ValueError("Jede Force braucht mindestens ein 'mode'-Feld")
+    return forces
+
+
+def force_queue_menu():
+    """Force-Queue eines Tokens per Batch bedienen."""
+    print(colored("\n🎬 FORCE-QUEUE", Colors.BOLD))
+    print("=" * 50)
+    print("1. 📜 Show-Skript senden (JSON)")
+    print("2. 📥 Queue abholen und bestätigen")
+    print("3. ↩️  Zurück")
+
+    choice = input("\nWähle (1-3): ").strip()
+    if choice not in ("1", "2"):
+        return
+    token = input("Token: ").strip().upper()
+    if not token:
+        return
+
+    try:
+        if choice == "1":
+            forces = load_show_script(input("Pfad zum Show-Skript: ").strip())
+            ids, queued = push_forces(token, forces)
+            print(colored(f"✅ {len(ids)} Forces gesendet (Queue: {queued})", Colors.GREEN))
+        else:
+            queue = drain_forces(token)
+            if not queue:
+                print(colored("ℹ️  Queue ist leer", Colors.YELLOW))
+            for item in queue:
+                print(f"  {format_date(item.get('createdAt'))}  {item['id']}  {json.dumps(item.get('force'))}")
+    except (OSError, ValueError) as e:
+        print(colored(f"❌ Show-Skript ungültig: {e}", Colors.RED))
+    except requests.exceptions.RequestException as e:
+        print(colored(f"❌ Netzwerk-Fehler: {e}", Colors.RED))
+    except RuntimeError as e:
+        print(colored(f"❌ {e}", Colors.RED))
 
 
 def search_licenses(search_term: str):
     """Sucht nach Lizenzen nach Code oder Benutzername."""
-    url = f"{BASE_URL}/api/licenses"
-    headers = {"x-admin-key": ADMIN_KEY}
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = admin_get("/api/licenses", params=COMPACT_LIST_PARAMS)
         if response.status_code == 200:
-            licenses = response.json().get("licenses", [])
+            licenses = decode_list(response.json(), "licenses")
             found = []
             for lic in licenses:
                 code = lic.get("code", "")
@@ -1007,26 +1120,31 @@ def batch_operations():
     print("=" * 50)
     print("1. 📤 Lizenzen aus CSV importieren (nicht verfügbar)")
     print("2. 📥 Alle Lizenzen exportieren")
-    print("3. 🗑️  Alle ungenutzten Lizenzen löschen (nicht verfügbar)")
+    print("3. 🗑️  Lizenzen löschen (ungenutzt, Typ, Datum, Code-Liste)")
     print("4. 📊 Vollständiger Datenbank-Export (nicht verfügbar)")
-    print("5. ↩️  Zurück")
+    print("5. 🎬 Force-Queue (Show-Skript, Queue abholen)")
+    print("6. ↩️  Zurück")
 
-    choice = input("\nWähle (1-5): ").strip()
+    choice = input("\nWähle (1-6): ").strip()
     if choice == "1":
         print(colored("❌ CSV-Import wird vom Backend derzeit nicht unterstützt.", Colors.RED))
     elif choice == "2":
         export_all_licenses()
     elif choice == "3":
-        print(colored("❌ Löschen ungenutzter Lizenzen wird derzeit nicht unterstützt.", Colors.RED))
+        purge_menu()
     elif choice == "4":
         print(colored("❌ Vollständiger DB-Export wird derzeit nicht unterstützt.", Colors.RED))
+    elif choice == "5":
+        force_queue_menu()
 
 
 def get_system_status():
     """Prüft den System-Status."""
-    url = f"{BASE_URL}/api/status"
+    warmup = start_warmup(BASE_URL)
+    if not warmup.done.wait(1):
+        print(colored("⏳ Server wird geweckt (Cold Start), bitte warten...", Colors.YELLOW))
     try:
-        response = requests.get(url, timeout=5)
+        response = resilient_get(BASE_URL, "/api/status")
         if response.status_code == 200:
             status = response.json()
             print(colored("✅ Server ist online", Colors.GREEN))
@@ -1082,9 +1200,10 @@ def user_menu():
         print("1. 📋 Alle User anzeigen")
         print("2. 🔍 User Details")
         print("3. 🎯 Alle Tokens anzeigen")
-        print("4. ↩️  Zurück")
+        print("4. 🔄 User-Index neu laden")
+        print("5. ↩️  Zurück")
 
-        choice = input("\nWähle (1-4): ").strip()
+        choice = input("\nWähle (1-5): ").strip()
         if choice == "1":
             list_all_users()
         elif choice == "2":
@@ -1093,6 +1212,12 @@ def user_menu():
         elif choice == "3":
             list_all_tokens()
         elif choice == "4":
+            try:
+                index = get_admin_index(refresh=True)
+                print(colored(f"✅ Index geladen: {len(index.users_by_id)} User", Colors.GREEN))
+            except (requests.exceptions.RequestException, RuntimeError) as e:
+                print(colored(f"❌ {e}", Colors.RED))
+        elif choice == "5":
             break
 
 
@@ -1104,9 +1229,10 @@ def stats_menu():
         print("1. 📊 Datenbank-Statistiken")
         print("2. 📈 Nutzungs-Report")
         print("3. 🔄 Live-Monitoring")
-        print("4. ↩️  Zurück")
+        print("4. 🔑 Token-Cache")
+        print("5. ↩️  Zurück")
 
-        choice = input("\nWähle (1-4): ").strip()
+        choice = input("\nWähle (1-5): ").strip()
         if choice == "1":
             get_database_stats()
         elif choice == "2":
@@ -1114,9 +1240,32 @@ def stats_menu():
         elif choice == "3":
             live_monitoring()
         elif choice == "4":
+            show_token_cache_stats()
+        elif choice == "5":
             break
 
 
+def show_token_cache_stats():
+    """Zeigt Treffer/Fehlzugriffe des serverseitigen Token-Caches."""
+    try:
+        response = admin_get("/api/tokens/cache")
+        if response.status_code != 200:
+            print(colored(f"❌ Fehler {response.status_code}", Colors.RED))
+            return None
+        stats = response.json()
+        print(colored("\n🔑 TOKEN-CACHE", Colors.BOLD))
+        print("=" * 50)
+        print(f"  Einträge: {stats.get('size', 0)}/{stats.get('maxSize', 0)} (TTL {stats.get('ttlMs', 0) / 1000:.0f}s)")
+        print(f"  Treffer: {stats.get('hits', 0)}")
+        print(f"  Fehlzugriffe: {stats.get('misses', 0)}")
+        print(f"  Trefferquote: {stats.get('hitRate', 0) * 100:.1f}%")
+        print(f"  Verdrängt: {stats.get('evictions', 0)}  Invalidiert: {stats.get('invalidations', 0)}")
+        return stats
+    except requests.exceptions.RequestException as e:
+        print(colored(f"❌ Netzwerk-Fehler: {e}", Colors.RED))
+    return None
+
+
 def generate_usage_report():
     """Generiert einen Nutzungsbericht basierend auf aggregierten Statistiken."""
     stats = get_database_stats()
@@ -1132,33 +1281,794 @@ def generate_usage_report():
         print(f"Aktive Tokens: {stats.get('tokens', {}).get('active', 0)}")
 
 
+# --- Event-Stream ---
+# /api/events liefert Server-Sent Events (Lizenz-Einlösungen, neue Tokens,
+# Force-Queue push/ack). Nach Verbindungsabbruch wird mit Last-Event-ID
+# fortgesetzt; ein "reset"-Event bedeutet, dass Events verpasst wurden.
+
+EVENT_READ_TIMEOUT = 60  # Server sendet alle 25s einen Heartbeat
+EVENT_RECONNECT_DELAY = 3
+
+
+class EventStreamUnavailable(RuntimeError):
+    """Der Server bietet (noch) keinen Event-Stream an."""
+
+
+def iter_events(last_event_id=None, instance=None):
+    """Liefert Events von /api/events als {"id", "type", "data"} und verbindet sich bei Abbruch neu.
+
+    Ohne Last-Event-ID kann der Server verpasste Events nicht nachliefern;
+    nach jedem solchen Verbindungsaufbau kommt daher zuerst ein "reset"
+    (reason "connect"), auf den hin der Aufrufer seinen Stand neu lädt.
+    """
+    instance = instance or default_instance()
+    url = f"{instance['base_url']}/api/events"
+    while True:
+        headers = {"x-admin-key": instance["admin_key"], "Accept": "text/event-stream"}
+        if last_event_id:
+            headers["Last-Event-ID"] = last_event_id
+        try:
+            with requests.get(url, headers=headers, stream=True,
+                              timeout=(instance["timeout"], EVENT_READ_TIMEOUT)) as response:
+                if response.status_code == 404:
+                    raise EventStreamUnavailable("Event-Stream wird vom Server nicht unterstützt")
+                if response.status_code >= 500:
+                    # Neustart oder Überlast: wie einen Verbindungsabbruch behandeln
+                    raise requests.exceptions.ConnectionError(f"Server Fehler {response.status_code}")
+                if response.status_code != 200:
+                    raise RuntimeError(f"Fehler {response.status_code}")
+                response.encoding = "utf-8"
+                if not last_event_id:
+                    yield {"id": None, "type": "reset",
+                           "data": {"reason": "connect", "timestamp": time.time() * 1000}}
+                fields = {}
+                for line in response.iter_lines(decode_unicode=True):
+                    if line:
+                        if line.startswith(":"):
+                            continue  # Heartbeat/Kommentar
+                        name, _, value = line.partition(":")
+                        value = value[1:] if value.startswith(" ") else value
+                        if name == "data" and "data" in fields:
+                            fields["data"] += "\n" + value
+                        else:
+                            fields[name] = value
+                        continue
+                    # Leerzeile beendet ein Event
+                    if "data" in fields:
+                        last_event_id = fields.get("id", last_event_id)
+                        try:
+                            data = json.loads(fields["data"])
+                        except ValueError:
+                            data = {"raw": fields["data"]}
+                        yield {"id": last_event_id, "type": fields.get("event", "message"), "data": data}
+                    fields = {}
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                requests.exceptions.ChunkedEncodingError):
+            pass
+        time.sleep(EVENT_RECONNECT_DELAY)
+
+
+def format_event(event: dict):
+    """Einzeilige Darstellung eines Server-Events."""
+    data = event.get("data", {})
+    when = datetime.fromtimestamp(data["timestamp"] / 1000).strftime("%H:%M:%S") if data.get("timestamp") else "--:--:--"
+    descriptions = {
+        "license_checked": lambda d: f"🔎 Lizenz {d.get('code')} geprüft",
+        "license_redeemed": lambda d: f"🎫 Lizenz {d.get('code')} eingelöst von {d.get('username')}",
+        "token_created": lambda d: f"🔑 Token {d.get('token')} für {d.get('username')}",
+        "force_queued": lambda d: f"📥 {d.get('count', 1)} Force(s) für {d.get('token')} (Queue: {d.get('queued', '?')})",
+        "force_acked": lambda d: f"✅ {d.get('count', 1)} Force(s) bestätigt für {d.get('token')}",
+        "reset": lambda d: ("🔌 Verbunden, Daten geladen" if d.get("reason") == "connect"
+                            else "⚠️  Events verpasst, Daten werden neu geladen"),
+    }
+    describe = descriptions.get(event["type"], lambda d: f"{event['type']} {d}")
+    return f"{when} {describe(data)}"
+
+
+def apply_event_to_stats(stats: dict, event: dict):
+    """Aktualisiert die Statistik-Zähler anhand eines Events."""
+    data = event.get("data", {})
+    forces = stats.setdefault("forces", {})
+    if event["type"] == "license_redeemed":
+        stats["users"]["total"] += 1
+        stats["users"]["regular"] += 1
+        stats["licenses"]["used"] += 1
+        stats["licenses"]["available"] -= 1
+    elif event["type"] == "token_created":
+        stats["tokens"]["active"] += 1
+    elif event["type"] == "force_queued":
+        forces["queued"] = forces.get("queued", 0) + data.get("count", 1)
+    elif event["type"] == "force_acked":
+        forces["acked"] = forces.get("acked", 0) + data.get("count", 1)
+
+
+def _render_monitoring(stats: dict, recent_events):
+    # Bildschirm "leeren"
+    print("\033[2J\033[H")
+    print(colored("🔄 LIVE MONITORING", Colors.BOLD))
+    print(f"Zeit: {datetime.now().strftime('%H:%M:%S')}")
+    print("-" * 30)
+    print(f"Users: {stats.get('users', {}).get('total', 0)}")
+    print(f"Lizenzen gesamt: {stats.get('licenses', {}).get('total', 0)}")
+    print(f"Lizenzen verwendet: {stats.get('licenses', {}).get('used', 0)}")
+    print(f"Aktive Tokens: {stats.get('tokens', {}).get('active', 0)}")
+    if recent_events is not None:
+        forces = stats.get("forces", {})
+        print(f"Forces seit Start: {forces.get('queued', 0)} gesendet, {forces.get('acked', 0)} bestätigt")
+        print("-" * 30)
+        for event in recent_events:
+            print(format_event(event))
+
+
+def _poll_monitoring():
+    """Fallback ohne Event-Stream: Statistiken alle 5 Sekunden neu laden."""
+    while True:
+        stats = get_database_stats()
+        if stats:
+            _render_monitoring(stats, None)
+        time.sleep(5)
+
+
 def live_monitoring():
-    """Live-Monitoring der Serveraktivität."""
+    """Live-Monitoring der Serveraktivität (Event-Stream, sonst Polling)."""
     print(colored("\n🔄 LIVE MONITORING (Drücke Ctrl+C zum Beenden)", Colors.YELLOW))
     print("=" * 50)
     try:
-        while True:
-            stats = get_database_stats()
-            if stats:
-                # Bildschirm "leeren"
-                print("\033[2J\033[H")
-                print(colored("🔄 LIVE MONITORING", Colors.BOLD))
-                print(f"Zeit: {datetime.now().strftime('%H:%M:%S')}")
-                print("-" * 30)
-                print(f"Users: {stats.get('users', {}).get('total', 0)}")
-                print(f"Lizenzen gesamt: {stats.get('licenses', {}).get('total', 0)}")
-                print(f"Lizenzen verwendet: {stats.get('licenses', {}).get('used', 0)}")
-                print(f"Aktive Tokens: {stats.get('tokens', {}).get('active', 0)}")
-            time.sleep(5)
+        stats = None
+        recent_events = deque(maxlen=15)
+        try:
+            # Stand erst nach dem Verbindungsaufbau laden (erstes Event ist "reset"),
+            # sonst gehen Events zwischen Snapshot und Verbindung verloren
+            for event in iter_events():
+                if event["type"] == "reset":
+                    stats = get_database_stats() or stats
+                    if not stats:
+                        return
+                    if _admin_index is not None:
+                        get_admin_index(refresh=True)
+                else:
+                    apply_event_to_stats(stats, event)
+                    if _admin_index is not None:
+                        _admin_index.apply_event(event)
+                recent_events.appendleft(event)
+                _render_monitoring(stats, recent_events)
+        except EventStreamUnavailable:
+            _poll_monitoring()
+    except RuntimeError as e:
+        print(colored(f"❌ {e}", Colors.RED))
     except KeyboardInterrupt:
         print(colored("\n✅ Monitoring beendet", Colors.GREEN))
 
 
+# --- Wartung (Aufbewahrung & Verdichtung) ---
+# Der Server löscht pro Request höchstens COMPACT_BATCH_SIZE Zeilen; die
+# Pause zwischen den Batches lässt andere Schreibzugriffe (Forces, Logins)
+# an die Datenbank, statt sie für die ganze Laufzeit zu blockieren.
+
+COMPACT_BATCH_SIZE = 500
+COMPACT_PAUSE = 0.2
+RETENTION_LABELS = {
+    "force_queue": "Bestätigte Forces",
+    "audit_log": "Audit-Log (→ Tageswerte)",
+}
+
+
+def _maintenance_request(path: str, data=None, timeout: int = 30):
+    """POST an einen Wartungs-Endpunkt."""
+    url = f"{BASE_URL}{path}"
+    headers = {
+        "Content-Type": "application/json",
+        "x-admin-key": ADMIN_KEY,
+    }
+    response = requests.post(url, headers=headers, json=data or {}, timeout=timeout)
+    if response.status_code != 200:
+        raise RuntimeError(f"Fehler {response.status_code}: {response.text}")
+    return response.json()
+
+
+def get_storage_stats():
+    """Dateigröße, freie Seiten und Zeilenzahlen der großen Tabellen."""
+    response = admin_get("/api/maintenance/storage")
+    if response.status_code != 200:
+        raise RuntimeError(f"Fehler {response.status_code}")
+    return response.json()
+
+
+def format_bytes(size: float):
+    """Formatiert Bytes für die Anzeige."""
+    for unit in ("B", "KB", "MB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def print_storage_stats(stats: dict):
+    rows = stats.get("rows", {})
+    print(colored("\n💾 SPEICHER", Colors.BOLD))
+    print("=" * 50)
+    print(f"  Datei: {format_bytes(stats.get('fileBytes', 0))} (frei: {format_bytes(stats.get('freeBytes', 0))})")
+    print(f"  Force-Queue: {rows.get('forceQueue', 0)} Zeilen ({rows.get('forceQueueProcessed', 0)} bestätigt)")
+    print(f"  Audit-Log: {rows.get('auditLog', 0)} Zeilen, {rows.get('auditLogDaily', 0)} Tageswerte")
+
+
+def compact_table(target: str, older_than_days: int, dry_run: bool = False):
+    """Löscht/verdichtet Zeilen älter als older_than_days in Server-Batches.
+
+    Returns:
+        Anzahl gelöschter (bzw. bei dry_run betroffener) Zeilen
+    """
+    data = {"target": target, "olderThanDays": older_than_days, "limit": COMPACT_BATCH_SIZE}
+    if dry_run:
+        return _maintenance_request("/api/maintenance/compact", dict(data, dryRun=True)).get("matched", 0)
+
+    deleted = 0
+    while True:
+        result = _maintenance_request("/api/maintenance/compact", data)
+        deleted += result.get("deleted", 0)
+        print(f"  🧹 {RETENTION_LABELS.get(target, target)}: {deleted} entfernt, {result.get('remaining', 0)} übrig",
+              end="\r", flush=True)
+        if result.get("deleted", 0) == 0 or result.get("remaining", 0) == 0:
+            break
+        time.sleep(COMPACT_PAUSE)
+    print()
+    return deleted
+
+
+def apply_retention(policies=None, dry_run: bool = False):
+    """Wendet die Aufbewahrungsrichtlinien an und berichtet den gewonnenen Platz."""
+    policies = policies or RETENTION_POLICIES
+    try:
+        before = get_storage_stats()
+        results = {}
+        for target, days in policies.items():
+            results[target] = compact_table(target, days, dry_run=dry_run)
+            verb = "betroffen" if dry_run else "entfernt"
+            print(f"  {RETENTION_LABELS.get(target, target)} älter als {days} Tage: {results[target]} {verb}")
+        if dry_run:
+            return results
+
+        after = get_storage_stats()
+        reclaimed = after.get("freeBytes", 0) - before.get("freeBytes", 0)
+        print(colored(f"✅ {format_bytes(max(reclaimed, 0))} in der Datei freigegeben "
+                      f"(wird wiederverwendet; VACUUM verkleinert die Datei)", Colors.GREEN))
+        return results
+    except requests.exceptions.RequestException as e:
+        print(colored(f"❌ Netzwerk-Fehler: {e}", Colors.RED))
+    except RuntimeError as e:
+        print(colored(f"❌ {e}", Colors.RED))
+    return None
+
+
+def vacuum_database():
+    """Verkleinert die Datenbankdatei (sperrt die Datenbank währenddessen)."""
+    try:
+        result = _maintenance_request("/api/maintenance/vacuum", timeout=300)
+        before, after = result["before"]["fileBytes"], result["after"]["fileBytes"]
+        print(colored(f"✅ Datei: {format_bytes(before)} → {format_bytes(after)} "
+                      f"({format_bytes(before - after)} zurückgewonnen)", Colors.GREEN))
+    except requests.exceptions.RequestException as e:
+        print(colored(f"❌ Netzwerk-Fehler: {e}", Colors.RED))
+    except RuntimeError as e:
+        print(colored(f"❌ {e}", Colors.RED))
+
+
+def _ask_days(default: int):
+    value = input(f"Älter als wie viele Tage? [{default}]: ").strip()
+    if not value:
+        return default
+    if not value.isdigit() or int(value) < 1:
+        print(colored("❌ Ungültige Anzahl Tage", Colors.RED))
+        return None
+    return int(value)
+
+
+def maintenance_menu():
+    """Wartung Untermenü."""
+    while True:
+        print(colored("\n🧹 WARTUNG", Colors.BOLD))
+        print("=" * 50)
+        print("1. 💾 Speicherbelegung anzeigen")
+        print("2. 🧹 Aufbewahrungsrichtlinien anwenden "
+              f"(Queue {RETENTION_POLICIES['force_queue']}d, Audit {RETENTION_POLICIES['audit_log']}d)")
+        print("3. 📥 Nur Force-Queue bereinigen")
+        print("4. 📋 Nur Audit-Log verdichten")
+        print("5. 🗜️  Datei verkleinern (VACUUM)")
+        print("6. ↩️  Zurück")
+
+        choice = input("\nWähle (1-6): ").strip()
+        if choice == "1":
+            try:
+                print_storage_stats(get_storage_stats())
+            except requests.exceptions.RequestException as e:
+                print(colored(f"❌ Netzwerk-Fehler: {e}", Colors.RED))
+            except RuntimeError as e:
+                print(colored(f"❌ {e}", Colors.RED))
+        elif choice in ("2", "3", "4"):
+            if choice == "2":
+                policies = dict(RETENTION_POLICIES)
+            else:
+                target = "force_queue" if choice == "3" else "audit_log"
+                days = _ask_days(RETENTION_POLICIES[target])
+                if days is None:
+                    continue
+                policies = {target: days}
+            if apply_retention(policies, dry_run=True) is None:
+                continue
+            if input("Fortfahren? (j/n): ").lower() == 'j':
+                apply_retention(policies)
+        elif choice == "5":
+            confirm = input(colored("⚠️  VACUUM sperrt die Datenbank für die Dauer. Fortfahren? (j/n): ", Colors.YELLOW))
+            if confirm.lower() == 'j':
+                vacuum_database()
+        elif choice == "6":
+            break
+
+
+# --- Multi-Instanz-Modus ---
+
+def load_instances(path=None):
+    """Lädt die Instanz-Liste für den Multi-Instanz-Modus.
+
+    Returns:
+        Liste von Dicts mit name, base_url, admin_key und timeout
+    """
+    path = path or INSTANCES_FILE
+    if not path:
+        return []
+    try:
+        with open(path) as f:
+            raw = json.load(f)
+    except (OSError, ValueError) as e:
+        print(colored(f"❌ Instanz-Datei konnte nicht gelesen werden: {e}", Colors.RED))
+        return []
+    if not isinstance(raw, list) or not all(isinstance(entry, dict) for entry in raw):
+        print(colored(f"❌ Instanz-Datei {path} muss eine JSON-Liste von Objekten sein, "
+                      f'z.B. [{{"name": "staging", "base_url": "https://..."}}]', Colors.RED))
+        return []
+
+    instances = []
+    for i, entry in enumerate(raw, 1):
+        if not entry.get("base_url"):
+            continue
+        instances.append({
+            "name": entry.get("name") or f"instanz-{i}",
+            "base_url": entry["base_url"].rstrip("/"),
+            "admin_key": entry.get("admin_key", ADMIN_KEY),
+            "timeout": float(entry.get("timeout", DEFAULT_TIMEOUT)),
+        })
+    return instances
+
+
+def fan_out(instances, func):
+    """Führt func(instance) parallel für alle Instanzen aus.
+
+    Jede Instanz hat ihr eigenes Zeitbudget (timeout der Instanz); eine
+    hängende Instanz blockiert die Ergebnisse der anderen nicht. func erhält
+    eine Kopie der Instanz mit "deadline" (Ende des Budgets) und
+    "hedge": False, damit admin_get alle Requests darin an das Budget bindet.
+
+    Returns:
+        Liste von (instance, result, error, elapsed_seconds) in Konfigurationsreihenfolge
+    """
+    pool = ThreadPoolExecutor(max_workers=max(len(instances), 1))
+    start = time.monotonic()
+    futures = [
+        (inst, pool.submit(func, dict(inst, deadline=start + inst["timeout"], hedge=False)))
+        for inst in instances
+    ]
+    results = []
+    for inst, future in futures:
+        # Zusätzliche Sekunde Puffer über dem Request-Timeout der Instanz
+        remaining = inst["timeout"] + 1 - (time.monotonic() - start)
+        try:
+            result = future.result(timeout=max(remaining, 0))
+            results.append((inst, result, None, time.monotonic() - start))
+        except FutureTimeout:
+            results.append((inst, None, "Timeout", time.monotonic() - start))
+        except Exception as e:
+            results.append((inst, None, str(e), time.monotonic() - start))
+    pool.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+def _print_instance_errors(results):
+    for inst, _, error, _ in results:
+        if error:
+            print(colored(f"  ❌ {inst['name']}: {error}", Colors.RED))
+
+
+def _fetch_instance_stats(instance):
+    # Parallel wie get_admin_index: fan_out gibt jeder Instanz nur das
+    # Zeitbudget eines einzelnen Requests
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        users = pool.submit(fetch_admin_list, "/api/users", "users", instance)
+        licenses = pool.submit(fetch_admin_list, "/api/licenses", "licenses", instance)
+        tokens = pool.submit(fetch_admin_list, "/api/tokens", "tokens", instance)
+        return compute_stats(users.result(), licenses.result(), tokens.result())
+
+
+def multi_stats(instances):
+    """Statistiken aller Instanzen, zusammengeführt mit Aufschlüsselung pro Instanz."""
+    print(colored(f"📊 Lade Statistiken von {len(instances)} Instanzen...", Colors.YELLOW))
+    results = fan_out(instances, _fetch_instance_stats)
+
+    totals = {"users": 0, "admins": 0, "licenses": 0, "used": 0, "available": 0, "tokens": 0}
+    print(colored("\n📊 STATISTIKEN PRO INSTANZ", Colors.BOLD))
+    print("=" * 70)
+    print(f"{'Instanz':<20}{'Users':>8}{'Lizenzen':>10}{'Verwendet':>11}{'Verfügbar':>11}{'Tokens':>8}")
+    for inst, stats, error, _ in results:
+        if error:
+            continue
+        row = {
+            "users": stats["users"]["total"],
+            "admins": stats["users"]["admins"],
+            "licenses": stats["licenses"]["total"],
+            "used": stats["licenses"]["used"],
+            "available": stats["licenses"]["available"],
+            "tokens": stats["tokens"]["active"],
+        }
+        for k, v in row.items():
+            totals[k] += v
+        print(f"{inst['name']:<20}{row['users']:>8}{row['licenses']:>10}{row['used']:>11}"
+              f"{row['available']:>11}{row['tokens']:>8}")
+    print("-" * 70)
+    print(colored(f"{'GESAMT':<20}{totals['users']:>8}{totals['licenses']:>10}{totals['used']:>11}"
+                  f"{totals['available']:>11}{totals['tokens']:>8}", Colors.BOLD))
+    _print_instance_errors(results)
+    return totals
+
+
+def multi_search_licenses(instances, search_term: str):
+    """Sucht Lizenzen in allen Instanzen gleichzeitig."""
+    def search(instance):
+        licenses = fetch_admin_list("/api/licenses", "licenses", instance)
+        return [
+            lic for lic in licenses
+            if search_term.upper() in lic.get("code", "")
+            or search_term.lower() in (lic.get("used_by_username") or "").lower()
+        ]
+
+    results = fan_out(instances, search)
+    total = sum(len(found) for _, found, error, _ in results if not error)
+    print(colored(f"\n🔍 {total} Lizenz(en) in {len(instances)} Instanzen gefunden", Colors.GREEN))
+    for inst, found, error, _ in results:
+        if error or not found:
+            continue
+        print(colored(f"\n🌐 {inst['name']} ({len(found)})", Colors.CYAN))
+        for lic in found:
+            code = lic.get("code", "?")
+            if lic.get("is_used"):
+                print(f"  {code} - Verwendet von {lic.get('used_by_username', 'Unknown')}")
+            else:
+                print(f"  {code} - Verfügbar")
+    _print_instance_errors(results)
+
+
+def multi_list_tokens(instances):
+    """Listet die Tokens aller Instanzen auf."""
+    results = fan_out(instances, lambda inst: fetch_admin_list("/api/tokens", "tokens", inst))
+    total = sum(len(tokens) for _, tokens, error, _ in results if not error)
+    print(colored(f"\n🔑 {total} TOKENS IN {len(instances)} INSTANZEN", Colors.BOLD))
+    print("=" * 50)
+    for inst, tokens, error, _ in results:
+        if error:
+            continue
+        print(colored(f"\n🌐 {inst['name']} ({len(tokens)})", Colors.CYAN))
+        for token in tokens:
+            print(f"  🔑 {token.get('token', 'N/A')} - {token.get('owner', 'Unknown')} "
+                  f"(Queued: {token.get('queued', 0)})")
+    _print_instance_errors(results)
+
+
+def multi_status(instances):
+    """Prüft den Status aller Instanzen gleichzeitig."""
+    def status(instance):
+        response = resilient_get(instance["base_url"], "/api/status", timeout=instance["timeout"],
+                                 deadline=instance["deadline"], hedge=False)
+        if response.status_code != 200:
+            raise RuntimeError(f"Server Fehler {response.status_code}")
+        return response.json()
+
+    results = fan_out(instances, status)
+    print(colored("\n🔍 SYSTEM STATUS PRO INSTANZ", Colors.BOLD))
+    print("=" * 50)
+    for inst, data, error, elapsed in results:
+        if error:
+            print(f"❌ {inst['name']:<20} offline ({error})")
+        else:
+            uptime = format_uptime(data["uptime"]) if data.get("uptime") is not None else "—"
+            print(f"✅ {inst['name']:<20} Uptime {uptime:<12} DB {data.get('database', '?'):<12} "
+                  f"{elapsed * 1000:.0f} ms")
+    online = sum(1 for _, _, error, _ in results if not error)
+    print(colored(f"\n{online}/{len(instances)} Instanzen online", Colors.BOLD))
+
+
+def multi_instance_menu():
+    """Multi-Instanz Untermenü."""
+    instances = load_instances()
+    if not instances:
+        print(colored("❌ Keine Instanzen konfiguriert (IMPERIA_INSTANCES auf eine JSON-Datei setzen).",
+                      Colors.RED))
+        return
+
+    while True:
+        print(colored(f"\n🌐 MULTI-INSTANZ ({len(instances)} Instanzen)", Colors.BOLD))
+        print("=" * 50)
+        print("1. 🔍 System Status")
+        print("2. 📊 Statistiken")
+        print("3. 🔍 Lizenz suchen")
+        print("4. 🔑 Alle Tokens anzeigen")
+        print("5. ↩️  Zurück")
+
+        choice = input("\nWähle (1-5): ").strip()
+        if choice == "1":
+            multi_status(instances)
+        elif choice == "2":
+            multi_stats(instances)
+        elif choice == "3":
+            search_term = input("Suchbegriff: ")
+            multi_search_licenses(instances, search_term)
+        elif choice == "4":
+            multi_list_tokens(instances)
+        elif choice == "5":
+            break
+
+
+# --- Profiling ---
+# Mit IMPERIA_PROFILE=cprofile läuft jeder Befehl unter cProfile und
+# tracemalloc; lang laufende Befehle (Live-Monitoring) werden stattdessen
+# per Stack-Sampling profiliert. IMPERIA_PROFILE=sample nutzt Sampling für
+# alle Befehle. Pro Befehlsaufruf wird ein Report in PROFILE_DIR geschrieben.
+
+PROFILED_COMMANDS = [
+    "create_license_codes", "list_all_licenses", "search_licenses", "revoke_license",
+    "export_all_licenses", "purge_menu", "list_all_users", "manage_user", "list_all_tokens",
+    "get_database_stats", "generate_usage_report", "live_monitoring", "audit_log_menu",
+    "view_audit_log", "get_system_status", "multi_status", "multi_stats",
+    "multi_search_licenses", "multi_list_tokens",
+]
+LONG_RUNNING_COMMANDS = {"live_monitoring"}
+SAMPLE_INTERVAL = 0.005
+REPORT_TOP_N = 30
+
+_profiling_active = False
+
+
+class StackSampler:
+    """Sampling-Profiler: liest in festen Abständen den Stack des Haupt-Threads."""
+
+    def __init__(self, thread_id, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = 0
+        self.self_counts = Counter()
+        self.total_counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            seen = set()
+            leaf = True
+            while frame is not None:
+                code = frame.f_code
+                key = (code.co_filename, code.co_firstlineno, code.co_name)
+                if leaf:
+                    self.self_counts[key] += 1
+                    leaf = False
+                if key not in seen:
+                    self.total_counts[key] += 1
+                    seen.add(key)
+                frame = frame.f_back
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def report(self, top_n: int = REPORT_TOP_N):
+        lines = [f"Samples: {self.samples} (Intervall {self.interval * 1000:.1f} ms)", ""]
+        for title, counts in (("Self (Funktion selbst aktiv)", self.self_counts),
+                              ("Kumulativ (Funktion im Stack)", self.total_counts)):
+            lines.append(title)
+            lines.append(f"{'Anteil':>8} {'Samples':>8}  Funktion")
+            for (filename, lineno, name), count in counts.most_common(top_n):
+                share = count / max(self.samples, 1) * 100
+                lines.append(f"{share:7.1f}% {count:>8}  {name} ({filename}:{lineno})")
+            lines.append("")
+        return "\n".join(lines)
+
+
+class ThreadProfiles:
+    """cProfile für Worker-Threads: ein Profile misst nur den Thread, der es
+    aktiviert, daher bekommt jeder während des Befehls gestartete Thread
+    (fan_out, Hedge-Requests) über threading.setprofile ein eigenes."""
+
+    def __init__(self):
+        self.profiles = []
+        self._lock = threading.Lock()
+        self._active = False
+
+    def _hook(self, frame, event, arg):
+        with self._lock:
+            if not self._active:
+                sys.setprofile(None)
+                return
+            profile = cProfile.Profile()
+            self.profiles.append(profile)
+        # Ersetzt diesen Hook im aktuellen Thread
+        profile.enable()
+
+    def start(self):
+        self._active = True
+        threading.setprofile(self._hook)
+
+    def stop(self):
+        threading.setprofile(None)
+        with self._lock:
+            self._active = False
+
+
+class PeakTracker:
+    """Hält den tracemalloc-Snapshot fest, der dem Speicher-Peak am nächsten liegt."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.snapshot = None
+        self._snapshot_size = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self):
+        current, _ = tracemalloc.get_traced_memory()
+        # Nur bei deutlichem Anstieg neu aufnehmen, Snapshots sind teuer
+        if current > self._snapshot_size * 1.1:
+            self.snapshot = tracemalloc.take_snapshot()
+            self._snapshot_size = current
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.check()
+
+
+def _write_profile_report(command: str, mode: str, elapsed: float, body: str, threads: str = ""):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = os.path.join(PROFILE_DIR, f"profile_{command}_{timestamp}.txt")
+    header = [
+        f"Befehl: {command}",
+        f"Modus: {mode}",
+        f"Zeitpunkt: {datetime.now().isoformat(timespec='seconds')}",
+        f"Wall-Time: {elapsed:.3f} s",
+    ]
+    if threads:
+        header.append(f"Threads: {threads}")
+    header.append("")
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        with open(filename, "w") as f:
+            f.write("\n".join(header) + body)
+        print(colored(f"📈 Profil gespeichert: {filename}", Colors.MAGENTA))
+    except OSError as e:
+        print(colored(f"❌ Profil konnte nicht gespeichert werden: {e}", Colors.RED))
+    return filename
+
+
+def _run_cprofile(func, args, kwargs):
+    global _hedge_pool
+    profiler = cProfile.Profile()
+    tracemalloc.start(10)
+    tracker = PeakTracker()
+    tracker.start()
+    thread_profiles = ThreadProfiles()
+    thread_profiles.start()
+    # Frischer Hedge-Pool, damit auch dessen Threads erst jetzt starten und profiliert werden
+    shared_pool, _hedge_pool = _hedge_pool, ThreadPoolExecutor(max_workers=HEDGE_POOL_WORKERS)
+    start = time.perf_counter()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - start
+        thread_profiles.stop()
+        tracker.stop()
+        _hedge_pool.shutdown(wait=False)
+        _hedge_pool = shared_pool
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        out = io.StringIO()
+        for sort_key in ("cumulative", "tottime"):
+            out.write(f"\n=== Hot Functions (sortiert nach {sort_key}) ===\n")
+            stats = pstats.Stats(profiler, stream=out)
+            for profile in thread_profiles.profiles:
+                stats.add(profile)
+            stats.strip_dirs().sort_stats(sort_key).print_stats(REPORT_TOP_N)
+
+        out.write(f"\n=== Speicher ===\nPeak: {peak / 1024:.1f} KiB\n")
+        if tracker.snapshot is not None:
+            out.write("\nAllokationen zum Peak-Zeitpunkt (nach Zeile):\n")
+            snapshot = tracker.snapshot.filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ])
+            for stat in snapshot.statistics("lineno")[:REPORT_TOP_N]:
+                out.write(f"{stat}\n")
+        _write_profile_report(
+            func.__name__, "cprofile + tracemalloc", elapsed, out.getvalue(),
+            threads=f"Haupt-Thread + {len(thread_profiles.profiles)} Worker-Threads zusammengeführt; "
+                    "Threads, die schon vor dem Befehl liefen, sind nicht erfasst",
+        )
+
+
+def _run_sampled(func, args, kwargs):
+    sampler = StackSampler(threading.get_ident())
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - start
+        sampler.stop()
+        _write_profile_report(func.__name__, "sampling", elapsed, "\n" + sampler.report(),
+                              threads="nur Haupt-Thread (Worker-Threads werden nicht gesampelt)")
+
+
+def profiled(func):
+    """Dekorator: führt den Befehl im konfigurierten Profiling-Modus aus."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        global _profiling_active
+        # Verschachtelte Befehle (z.B. Statistiken im Nutzungs-Report) laufen im äußeren Profil mit
+        if _profiling_active:
+            return func(*args, **kwargs)
+        _profiling_active = True
+        try:
+            if PROFILE_MODE == "sample" or func.__name__ in LONG_RUNNING_COMMANDS:
+                return _run_sampled(func, args, kwargs)
+            return _run_cprofile(func, args, kwargs)
+        finally:
+            _profiling_active = False
+    return wrapper
+
+
+def install_profiling():
+    """Ersetzt die Befehlsfunktionen durch profilierte Varianten."""
+    if PROFILE_MODE not in ("cprofile", "sample"):
+        print(colored(f"⚠️  Unbekannter Profiling-Modus '{PROFILE_MODE}' (cprofile oder sample)",
+                      Colors.YELLOW))
+        return
+    module = globals()
+    for name in PROFILED_COMMANDS:
+        module[name] = profiled(module[name])
+    print(colored(f"📈 Profiling aktiv ({PROFILE_MODE}), Reports in {os.path.abspath(PROFILE_DIR)}",
+                  Colors.MAGENTA))
+
+
 def main():
     """Hauptfunktion - Erweitertes interaktives Menü."""
     print(colored("🎩 Imperia Magic v3.0 - Enhanced Admin Tool", Colors.BOLD))
     print("=" * 50)
 
+    # Server so früh wie möglich aufwecken, das Menü wartet nicht darauf
+    start_warmup(BASE_URL)
+
+    if PROFILE_MODE:
+        install_profiling()
+
     # Hinweis, falls kein Admin-Key konfiguriert ist
     if not ADMIN_KEY:
         print(colored("⚠️  Kein ADMIN_KEY gesetzt. Admin-Endpunkte könnten ungeschützt sein.", Colors.YELLOW))
@@ -1178,9 +2088,11 @@ def main():
         print("4. 🔧 Batch-Operationen")
         print("5. 📋 Audit Log")
         print("6. 🔍 System Status")
-        print("7. ❌ Beenden")
+        print("7. 🌐 Multi-Instanz")
+        print("8. 🧹 Wartung")
+        print("9. ❌ Beenden")
 
-        choice = input("\nWähle (1-7): ").strip()
+        choice = input("\nWähle (1-9): ").strip()
         if choice == "1":
             license_menu()
         elif choice == "2":
@@ -1190,11 +2102,15 @@ def main():
         elif choice == "4":
             batch_operations()
         elif choice == "5":
-            view_audit_log()
+            audit_log_menu()
         elif choice == "6":
             get_system_status()
             time.sleep(2)
         elif choice == "7":
+            multi_instance_menu()
+        elif choice == "8":
+            maintenance_menu()
+        elif choice == "9":
             print(colored("👋 Auf Wiedersehen!", Colors.GREEN))
             break
         else:
@@ -1203,4 +2119,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
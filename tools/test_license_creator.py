@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Tests für license_creator.py (ohne Server; admin_get wird ersetzt).
+
+    python3 -m unittest discover tools
+"""
+
+import contextlib
+import io
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(__file__))
+import license_creator  # noqa: E402
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+
+    def json(self):
+        return self.payload
+
+
+class TestAuditLogCursor(unittest.TestCase):
+    def test_zero_cursor_is_sent(self):
+        with mock.patch.object(license_creator, "admin_get",
+                               return_value=FakeResponse({"entries": []})) as admin_get:
+            license_creator._fetch_audit_page({}, after=0)
+            license_creator._fetch_audit_page({}, before=0)
+            license_creator._fetch_audit_page({})
+        params = [call.kwargs["params"] for call in admin_get.call_args_list]
+        self.assertEqual(0, params[0]["after"])
+        self.assertEqual(0, params[1]["before"])
+        self.assertNotIn("after", params[2])
+        self.assertNotIn("before", params[2])
+
+    def test_follow_empty_log_pages_forward(self):
+        # Leeres gefiltertes Log: since_id=0 muss als after=0 ankommen, sonst
+        # liefert der Server die neuesten Einträge zuerst und der Cursor springt
+        pages = [
+            FakeResponse({"entries": [{"id": 1, "action": "a"}, {"id": 2, "action": "b"}]}),
+            FakeResponse({"entries": []}),
+        ]
+        with mock.patch.object(license_creator, "admin_get", side_effect=pages) as admin_get, \
+                mock.patch.object(license_creator.time, "sleep", side_effect=[None, KeyboardInterrupt]), \
+                contextlib.redirect_stdout(io.StringIO()) as out:
+            license_creator.follow_audit_log({}, since_id=0)
+        afters = [call.kwargs["params"]["after"] for call in admin_get.call_args_list]
+        self.assertEqual([0, 2], afters)
+        self.assertLess(out.getvalue().index("#1 "), out.getvalue().index("#2 "))
+
+
+if __name__ == "__main__":
+    unittest.main()